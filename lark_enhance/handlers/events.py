@@ -1,7 +1,9 @@
 from __future__ import annotations
 
-import datetime
+import asyncio
 import json
+import logging
+import time
 from typing import Any
 
 from astrbot.api import logger
@@ -10,11 +12,61 @@ from astrbot.api.message_components import At, Plain
 from astrbot.api.provider import ProviderRequest
 from astrbot.core.message.message_event_result import ResultContentType
 
+from ..mixins.history import HistoryRecord
+
+
+# on_llm_request 中不随请求变化的提示词片段
+_PROMPT_SEPARATOR = "\n----------------\n"
+
+_PROMPT_OUTPUT_FORMAT = (
+    "[输出格式要求]\n"
+    "请直接用自然语言回复，不要输出任何序列化格式如 JSON、Python 列表/字典等。"
+    "禁止输出类似 [{'type': 'text', 'text': '...'}] 这样的格式。"
+)
+
+_PROMPT_MEMORY_TOOLS = (
+    "[记忆功能]\n"
+    "你具有记忆信息的能力，支持两种范围：\n"
+    "- scope=\"user\"（默认）：个人记忆，仅对当前用户生效。用于记住用户个人信息（称呼、偏好、职业等）。\n"
+    "- scope=\"group\"：群记忆，对群内所有人生效。用于记住群相关信息（群规、项目背景、约定、群内通用知识等）。\n"
+    "记忆类型 memory_type 支持：instruction / preference / fact / meme（群梗）。\n"
+    "当用户要求记住信息时，根据信息性质选择合适的 scope 调用 lark_save_memory 工具。"
+    "当用户询问记忆时，使用 lark_list_memory 工具（支持 scope=\"all\"、memory_type 过滤）。"
+    "当用户要求忘记信息时，使用 lark_forget_memory 工具（支持 memory_type 过滤）。"
+)
+
+# 启用记忆功能时的开头两段，预先用分隔符拼接好
+_PROMPT_HEAD_WITH_MEMORY = _PROMPT_OUTPUT_FORMAT + _PROMPT_SEPARATOR + _PROMPT_MEMORY_TOOLS
+
+_PROMPT_EMOJI_TOOL = (
+    "[飞书表情工具调用策略]\n"
+    "- 当你有强烈情绪表达需求时（例如强烈点赞、祝贺、惊讶、安慰、无语、收到），优先调用 lark_emoji_reply。\n"
+    "- 特别是只需表达态度、不需要展开解释时，优先使用表情工具而不是长文本。\n"
+    "- 不要每条消息都调用；仅在情绪明显、表情能提升表达效果时调用。\n"
+    "- emoji 参数需使用飞书 emoji_type（如 THUMBSUP、JIAYI、APPLAUSE、SMILE、WOW、HEART、SOB、FACEPALM、LGTM、SALUTE）。"
+)
+
+_PROMPT_MEME_TOOL = (
+    "[群梗工具]\n"
+    "当用户明确要求“记住这个梗/这个群梗是...”时，使用 lark_save_memory，"
+    "并设置 scope=\"group\"、memory_type=\"meme\"。"
+    "当用户要求查看群梗时，使用 lark_list_memory（scope=\"group\", memory_type=\"meme\"）。"
+    "当用户要求删除群梗时，使用 lark_forget_memory（scope=\"group\", memory_type=\"meme\"）。"
+)
+
+_PROMPT_HUMAN_RHYTHM = (
+    "[拟人节奏]\n"
+    "- 先接话再回答，像在群里聊天，不要上来就长段科普。\n"
+    "- 优先 1~3 句短句，必要时再补充细节。\n"
+    "- 可适度口语化（如“我懂你意思”“哈哈这个点很真实”），但不要油腻。\n"
+    "- 避免每次都同一模板，句式和节奏要有变化。"
+)
+
 
 async def handle_on_message(plugin: Any, event: AstrMessageEvent):
     """监听飞书平台的所有消息事件。"""
     logger.debug(
-        f"[lark_enhance] Processing message: {event.message_obj.message_id}"
+        "[lark_enhance] Processing message: %s", event.message_obj.message_id
     )
 
     lark_client = plugin._get_lark_client(event)
@@ -23,37 +75,70 @@ async def handle_on_message(plugin: Any, event: AstrMessageEvent):
         return
 
     sender_id = event.get_sender_id()
-    enable_real_name = plugin.config.get("enable_real_name", True)
+    group_id = event.message_obj.group_id
+    enable_real_name = plugin._enable_real_name
 
+    name_ids: list[str] = []
+    at_comps: list[At] = []
     if sender_id and enable_real_name:
-        nickname = await plugin._get_user_nickname(lark_client, sender_id, event)
+        at_comps = [
+            comp for comp in event.message_obj.message if isinstance(comp, At) and comp.qq
+        ]
+        # 同一人可能被多次 @ 或 @ 了发送者自己，每个 open_id 只查询一次
+        name_ids = list(dict.fromkeys([sender_id, *(comp.qq for comp in at_comps)]))
+
+    fetch_group_info = bool(group_id and plugin._enable_group_info)
+
+    parent_id = None
+    if plugin._enable_quoted_content:
+        parent_id = getattr(event.message_obj.raw_message, "parent_id", None)
+        if parent_id:
+            logger.debug(
+                "[lark_enhance] Found parent_id: %s, fetching quoted content...", parent_id
+            )
+
+    # 昵称解析、群信息与引用消息互不依赖，并发请求，耗时取决于最慢的一次调用
+    coros = [plugin._get_user_nickname(lark_client, uid, event) for uid in name_ids]
+    if fetch_group_info:
+        coros.append(plugin._get_group_info(lark_client, group_id))
+    if parent_id:
+        coros.append(plugin._get_message_content(lark_client, parent_id))
+
+    results = await asyncio.gather(*coros, return_exceptions=True)
+    for idx, res in enumerate(results):
+        if isinstance(res, BaseException):
+            logger.error(f"[lark_enhance] Concurrent Lark query failed: {res}")
+            results[idx] = None
+
+    nicknames = dict(zip(name_ids, results[: len(name_ids)]))
+    extra_results = iter(results[len(name_ids):])
+    group_info = next(extra_results) if fetch_group_info else None
+    quoted_result = next(extra_results) if parent_id else None
+
+    if name_ids:
+        nickname = nicknames[sender_id]
         if nickname:
-            logger.debug(f"[lark_enhance] Found nickname: {nickname} for {sender_id}")
+            logger.debug("[lark_enhance] Found nickname: %s for %s", nickname, sender_id)
             event.message_obj.sender.nickname = nickname
 
-        for comp in event.message_obj.message:
-            if isinstance(comp, At) and comp.qq:
-                real_name = await plugin._get_user_nickname(
-                    lark_client,
-                    comp.qq,
-                    event,
-                )
-                if real_name:
-                    logger.debug(f"[lark_enhance] Resolve At: {comp.qq} -> {real_name}")
-                    comp.name = real_name
+        for comp in at_comps:
+            real_name = nicknames[comp.qq]
+            if real_name:
+                logger.debug("[lark_enhance] Resolve At: %s -> %s", comp.qq, real_name)
+                comp.name = real_name
 
-        new_msg_str = ""
+        parts: list[str] = []
         for comp in event.message_obj.message:
             if isinstance(comp, At):
-                new_msg_str += f"@{comp.name or comp.qq} "
+                parts.append(f"@{comp.name or comp.qq} ")
             elif hasattr(comp, "text"):
-                new_msg_str += comp.text
+                parts.append(comp.text)
+        new_msg_str = "".join(parts)
 
         if new_msg_str:
             event.message_obj.message_str = new_msg_str
             event.message_str = new_msg_str
 
-    group_id = event.message_obj.group_id
     sender_name_for_meme = event.message_obj.sender.nickname or sender_id or "未知用户"
     cleaned_content_for_meme = plugin._clean_content(event.message_str or "")
     if group_id and cleaned_content_for_meme:
@@ -63,57 +148,46 @@ async def handle_on_message(plugin: Any, event: AstrMessageEvent):
             cleaned_content_for_meme,
         )
 
-    history_count = plugin.config.get("history_inject_count", 20)
+    history_count = plugin._history_count
     if group_id and history_count and history_count > 0:
         try:
-            plugin._ensure_history_deque(group_id, history_count)
-
-            time_str = datetime.datetime.now().strftime("%H:%M:%S")
+            time_str = plugin._format_time_hms(time.time())
             sender_name = (
                 event.message_obj.sender.nickname or sender_id or "未知用户"
             )
             content_str = plugin._clean_content(event.message_str)
 
             if content_str:
-                record_item = {
-                    "msg_id": event.message_obj.message_id,
-                    "time": time_str,
-                    "sender": sender_name,
-                    "sender_id": sender_id or "",
-                    "content": content_str,
-                }
-                plugin.group_history[group_id].append(record_item)
+                record_item = HistoryRecord.create(
+                    msg_id=event.message_obj.message_id,
+                    time=time_str,
+                    sender=sender_name,
+                    sender_id=sender_id or "",
+                    content=content_str,
+                )
+                plugin._history_deque(group_id).append(record_item)
                 plugin._save_history()
                 logger.debug(
-                    f"[lark_enhance] Recorded message for group {group_id}: {content_str[:20]}..."
+                    "[lark_enhance] Recorded message for group %s: %.20s...", group_id, content_str
                 )
         except Exception as e:
             logger.error(f"[lark_enhance] Failed to record message history: {e}")
 
-    if group_id and plugin.config.get("enable_group_info", True):
-        group_info = await plugin._get_group_info(lark_client, group_id)
-        if group_info:
-            event.set_extra("lark_group_info", group_info)
-
-    if plugin.config.get("enable_quoted_content", True):
-        raw_msg = event.message_obj.raw_message
-        parent_id = getattr(raw_msg, "parent_id", None)
-        if parent_id:
-            logger.debug(
-                f"[lark_enhance] Found parent_id: {parent_id}, fetching quoted content..."
-            )
-            result = await plugin._get_message_content(lark_client, parent_id)
+    if group_info:
+        event.set_extra("lark_group_info", group_info)
 
-            if result:
-                quoted_content, sender_name, quoted_images = result
-                logger.debug(
-                    f"[lark_enhance] Fetched quoted content: {quoted_content}, "
-                    f"sender: {sender_name}, quoted_images={len(quoted_images)}"
-                )
-                event.set_extra("lark_quoted_content", quoted_content)
-                event.set_extra("lark_quoted_sender", sender_name)
-                if quoted_images:
-                    event.set_extra("lark_quoted_images", quoted_images)
+    if quoted_result:
+        quoted_content, sender_name, quoted_images = quoted_result
+        logger.debug(
+            "[lark_enhance] Fetched quoted content: %s, sender: %s, quoted_images=%d",
+            quoted_content,
+            sender_name,
+            len(quoted_images),
+        )
+        event.set_extra("lark_quoted_content", quoted_content)
+        event.set_extra("lark_quoted_sender", sender_name)
+        if quoted_images:
+            event.set_extra("lark_quoted_images", quoted_images)
 
 
 async def handle_on_message_sent(plugin: Any, event: AstrMessageEvent):
@@ -132,22 +206,24 @@ async def handle_on_message_sent(plugin: Any, event: AstrMessageEvent):
     if not group_id:
         return
 
-    history_count = plugin.config.get("history_inject_count", 20)
+    history_count = plugin._history_count
     if not history_count or history_count <= 0:
         return
 
     try:
-        plugin._ensure_history_deque(group_id, history_count)
-
-        time_str = datetime.datetime.now().strftime("%H:%M:%S")
-        sender_name = plugin.config.get("bot_name", "助手")
+        now = time.time()
+        time_str = plugin._format_time_hms(now)
+        sender_name = plugin._bot_name
 
-        content_str = ""
         result = event.get_result()
-        if result and result.chain:
-            texts = [c.text for c in result.chain if isinstance(c, Plain)]
-            content_str = "".join(texts)
+        if not result or not result.chain:
+            return
 
+        texts = [c.text for c in result.chain if isinstance(c, Plain)]
+        if not texts:
+            return
+        # 常见情况下回复只有一个 Plain，无需 join
+        content_str = texts[0] if len(texts) == 1 else "".join(texts)
         if not content_str:
             return
 
@@ -155,19 +231,19 @@ async def handle_on_message_sent(plugin: Any, event: AstrMessageEvent):
         if not content_str:
             return
 
-        msg_id = f"sent_{int(datetime.datetime.now().timestamp())}"
-        record_item = {
-            "msg_id": msg_id,
-            "time": time_str,
-            "sender": sender_name,
-            "sender_id": "__bot__",
-            "content": content_str,
-        }
+        msg_id = f"sent_{int(now)}"
+        record_item = HistoryRecord.create(
+            msg_id=msg_id,
+            time=time_str,
+            sender=sender_name,
+            sender_id="__bot__",
+            content=content_str,
+        )
 
-        plugin.group_history[group_id].append(record_item)
+        plugin._history_deque(group_id).append(record_item)
         plugin._save_history()
         logger.debug(
-            f"[lark_enhance] Recorded SELF message for group {group_id}: {content_str[:20]}..."
+            "[lark_enhance] Recorded SELF message for group %s: %.20s...", group_id, content_str
         )
     except Exception as e:
         logger.error(f"[lark_enhance] Failed to record self message history: {e}")
@@ -178,25 +254,10 @@ async def handle_on_llm_request(plugin: Any, event: AstrMessageEvent, req: Provi
     if not plugin._is_lark_event(event):
         return
 
-    prompts_to_inject = []
-
-    prompts_to_inject.append(
-        "[输出格式要求]\n"
-        "请直接用自然语言回复，不要输出任何序列化格式如 JSON、Python 列表/字典等。"
-        "禁止输出类似 [{'type': 'text', 'text': '...'}] 这样的格式。"
-    )
-
-    if plugin.config.get("enable_user_memory", True):
-        prompts_to_inject.append(
-            "[记忆功能]\n"
-            "你具有记忆信息的能力，支持两种范围：\n"
-            "- scope=\"user\"（默认）：个人记忆，仅对当前用户生效。用于记住用户个人信息（称呼、偏好、职业等）。\n"
-            "- scope=\"group\"：群记忆，对群内所有人生效。用于记住群相关信息（群规、项目背景、约定、群内通用知识等）。\n"
-            "记忆类型 memory_type 支持：instruction / preference / fact / meme（群梗）。\n"
-            "当用户要求记住信息时，根据信息性质选择合适的 scope 调用 lark_save_memory 工具。"
-            "当用户询问记忆时，使用 lark_list_memory 工具（支持 scope=\"all\"、memory_type 过滤）。"
-            "当用户要求忘记信息时，使用 lark_forget_memory 工具（支持 memory_type 过滤）。"
-        )
+    # 开头的固定提示词已按是否启用记忆功能预先拼好
+    prompts_to_inject = [
+        _PROMPT_HEAD_WITH_MEMORY if plugin._enable_user_memory else _PROMPT_OUTPUT_FORMAT
+    ]
 
     sender_id = event.get_sender_id() or ""
     sender_name = event.message_obj.sender.nickname or sender_id or "未知用户"
@@ -208,20 +269,20 @@ async def handle_on_llm_request(plugin: Any, event: AstrMessageEvent, req: Provi
         f"- 简写：{sender_id_tail or '未知'}"
     )
 
-    if plugin.config.get("enable_group_info", True):
+    if plugin._enable_group_info:
         group_info = event.get_extra("lark_group_info")
         if group_info:
             group_name = group_info.get("name")
             group_desc = group_info.get("description")
             if group_name:
-                info_parts = [f"群名称：{group_name}"]
                 if group_desc:
-                    info_parts.append(f"群描述：{group_desc}")
-                prompts_to_inject.append(
-                    f"[当前群组信息]\n" + "\n".join(info_parts)
-                )
+                    prompts_to_inject.append(
+                        f"[当前群组信息]\n群名称：{group_name}\n群描述：{group_desc}"
+                    )
+                else:
+                    prompts_to_inject.append(f"[当前群组信息]\n群名称：{group_name}")
 
-    if plugin.config.get("enable_quoted_content", True):
+    if plugin._enable_quoted_content:
         quoted_content = event.get_extra("lark_quoted_content")
         quoted_sender = event.get_extra("lark_quoted_sender")
         quoted_images = event.get_extra("lark_quoted_images") or []
@@ -253,31 +314,34 @@ async def handle_on_llm_request(plugin: Any, event: AstrMessageEvent, req: Provi
                 req.image_urls = []
             req.image_urls.extend(quoted_images)
             logger.debug(
-                f"[lark_enhance] Injected {quoted_image_count} quoted image(s) into req.image_urls"
+                "[lark_enhance] Injected %d quoted image(s) into req.image_urls", quoted_image_count
             )
 
-    history_count = plugin.config.get("history_inject_count", 0)
+    history_count = plugin._history_count
     group_id = event.message_obj.group_id
 
     if history_count > 0 and group_id:
-        history_list = list(plugin.group_history.get(group_id, []))
-        if history_list:
+        history = plugin.group_history.get(group_id)
+        if history:
             current_msg_id = event.message_obj.message_id
-            filtered_history = [
-                f"[{item['time']}] {plugin._format_history_sender(item)}: {item['content']}"
-                for item in history_list
-                if item["msg_id"] != current_msg_id
-            ]
-
-            if filtered_history:
-                recent_history = filtered_history[-history_count:]
+            # 从队尾倒序取最近 history_count 条，无需复制和过滤整个队列
+            recent_history: list[str] = []
+            for item in reversed(history):
+                if item.msg_id == current_msg_id:
+                    continue
+                recent_history.append(item.line)
+                if len(recent_history) >= history_count:
+                    break
+
+            if recent_history:
+                recent_history.reverse()
                 history_str = "\n".join(recent_history)
                 prompts_to_inject.append(
                     f"\n[当前群聊最近 {len(recent_history)} 条消息记录（仅供参考，不包含当前消息）]\n{history_str}\n"
                 )
 
-    if plugin.config.get("enable_user_memory", True) and group_id:
-        inject_limit = plugin.config.get("memory_inject_limit", 10)
+    if plugin._enable_user_memory and group_id:
+        inject_limit = plugin._memory_inject_limit
         sender_id = event.get_sender_id()
         if sender_id:
             memories = plugin._memory_store.get_memories(group_id, sender_id, limit=inject_limit)
@@ -287,15 +351,17 @@ async def handle_on_llm_request(plugin: Any, event: AstrMessageEvent, req: Provi
                 prompts_to_inject.append(
                     f"[关于当前用户「{sender_name}」的记忆]\n{memory_str}"
                 )
-                logger.debug(f"[lark_enhance] Injected {len(memories)} memories for user {sender_id}")
+                logger.debug("[lark_enhance] Injected %d memories for user %s", len(memories), sender_id)
 
         group_memories = plugin._memory_store.get_group_memories(group_id, limit=inject_limit)
         if group_memories:
             group_memory_str = plugin._memory_store.format_memories_for_prompt(group_memories)
             prompts_to_inject.append(f"[关于当前群的记忆]\n{group_memory_str}")
-            logger.debug(f"[lark_enhance] Injected {len(group_memories)} group memories for {group_id}")
+            logger.debug(
+                "[lark_enhance] Injected %d group memories for %s", len(group_memories), group_id
+            )
 
-    if plugin.config.get("enable_vibe_sense", True) and group_id:
+    if plugin._enable_vibe_sense and group_id:
         vibe_label, vibe_strategy = plugin._analyze_group_vibe(group_id)
         prompts_to_inject.append(
             "[群聊氛围]\n"
@@ -304,16 +370,10 @@ async def handle_on_llm_request(plugin: Any, event: AstrMessageEvent, req: Provi
             "- 尽量像群友接话，不要像客服模板。"
         )
 
-    prompts_to_inject.append(
-        "[飞书表情工具调用策略]\n"
-        "- 当你有强烈情绪表达需求时（例如强烈点赞、祝贺、惊讶、安慰、无语、收到），优先调用 lark_emoji_reply。\n"
-        "- 特别是只需表达态度、不需要展开解释时，优先使用表情工具而不是长文本。\n"
-        "- 不要每条消息都调用；仅在情绪明显、表情能提升表达效果时调用。\n"
-        "- emoji 参数需使用飞书 emoji_type（如 THUMBSUP、JIAYI、APPLAUSE、SMILE、WOW、HEART、SOB、FACEPALM、LGTM、SALUTE）。"
-    )
+    prompts_to_inject.append(_PROMPT_EMOJI_TOOL)
 
-    if plugin.config.get("enable_meme_memory", True) and group_id:
-        meme_limit = plugin.config.get("memory_inject_limit", 10)
+    if plugin._enable_meme_memory and group_id:
+        meme_limit = plugin._memory_inject_limit
         memes = plugin._memory_store.get_group_memories(
             group_id=group_id,
             limit=meme_limit,
@@ -327,99 +387,116 @@ async def handle_on_llm_request(plugin: Any, event: AstrMessageEvent, req: Provi
                 "使用要求：自然、少量、相关时再用；不要强行玩梗。"
             )
 
-        prompts_to_inject.append(
-            "[群梗工具]\n"
-            "当用户明确要求“记住这个梗/这个群梗是...”时，使用 lark_save_memory，"
-            "并设置 scope=\"group\"、memory_type=\"meme\"。"
-            "当用户要求查看群梗时，使用 lark_list_memory（scope=\"group\", memory_type=\"meme\"）。"
-            "当用户要求删除群梗时，使用 lark_forget_memory（scope=\"group\", memory_type=\"meme\"）。"
-        )
+        prompts_to_inject.append(_PROMPT_MEME_TOOL)
 
-    if plugin.config.get("enable_human_rhythm", True):
-        prompts_to_inject.append(
-            "[拟人节奏]\n"
-            "- 先接话再回答，像在群里聊天，不要上来就长段科普。\n"
-            "- 优先 1~3 句短句，必要时再补充细节。\n"
-            "- 可适度口语化（如“我懂你意思”“哈哈这个点很真实”），但不要油腻。\n"
-            "- 避免每次都同一模板，句式和节奏要有变化。"
-        )
+    if plugin._enable_human_rhythm:
+        prompts_to_inject.append(_PROMPT_HUMAN_RHYTHM)
 
     if prompts_to_inject:
-        final_inject = (
-            "\n----------------\n".join(prompts_to_inject) + "\n----------------\n\n"
+        req.system_prompt = "".join(
+            (
+                req.system_prompt or "",
+                "\n\n",
+                _PROMPT_SEPARATOR.join(prompts_to_inject),
+                _PROMPT_SEPARATOR,
+                "\n",
+            )
         )
-        req.system_prompt = (req.system_prompt or "") + "\n\n" + final_inject
-
-    logger.info("=" * 20 + " [lark_enhance] LLM Request Payload " + "=" * 20)
-    logger.info(f"System Prompt:\n{req.system_prompt}")
-    logger.info(f"Contexts (History):\n{json.dumps(req.contexts, ensure_ascii=False, indent=2)}")
-    logger.info(f"Current Prompt:\n{req.prompt}")
-    logger.info("=" * 60)
-
-
-async def handle_on_decorating_result(plugin: Any, event: AstrMessageEvent):
-    """在消息发送前处理，清洗消息格式并将文本中的 @名字 转换为飞书 At 组件。"""
-    if not plugin._is_lark_event(event):
-        return
-
-    result = event.get_result()
-    if result is None or not result.chain:
-        return
-
-    if result.result_content_type == ResultContentType.STREAMING_FINISH:
-        return
-
-    cleaned_chain = []
-    for comp in result.chain:
-        if isinstance(comp, Plain):
-            cleaned_text = plugin._clean_content(comp.text)
-            cleaned_text = plugin._clean_mention_markdown(cleaned_text)
-            if cleaned_text != comp.text:
-                logger.debug(
-                    f"[lark_enhance] Cleaned message: {comp.text[:50]}... -> {cleaned_text[:50]}..."
-                )
-            cleaned_chain.append(Plain(cleaned_text))
-        else:
-            cleaned_chain.append(comp)
-    result.chain = cleaned_chain
-
-    if not plugin.config.get("enable_mention_convert", True):
-        return
 
+    contexts = req.contexts or []
+    logger.info(
+        "[lark_enhance] LLM request: system_prompt=%d chars, contexts=%d, prompt=%d chars",
+        len(req.system_prompt or ""),
+        len(contexts),
+        len(req.prompt or ""),
+    )
+    # 完整 payload（尤其是 contexts 的 JSON 序列化）开销较大，仅在 DEBUG 级别输出
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("=" * 20 + " [lark_enhance] LLM Request Payload " + "=" * 20)
+        logger.debug(f"System Prompt:\n{req.system_prompt}")
+        logger.debug(f"Contexts (History):\n{json.dumps(contexts, ensure_ascii=False, indent=2)}")
+        logger.debug(f"Current Prompt:\n{req.prompt}")
+        logger.debug("=" * 60)
+
+
+async def _get_mention_context(
+    plugin: Any,
+    event: AstrMessageEvent,
+) -> tuple[dict[str, str], Any] | None:
+    """获取 @ 转换所需的群成员映射与匹配正则，不满足条件时返回 None。"""
     lark_client = plugin._get_lark_client(event)
     if lark_client is None:
-        return
+        return None
 
     group_id = event.message_obj.group_id
     if not group_id:
-        return
+        return None
 
     members_map = await plugin._get_group_members(lark_client, group_id)
     if not members_map:
         logger.debug(
             "[lark_enhance] No group members found, skipping mention conversion"
         )
-        return
+        return None
 
     pattern = plugin._get_mention_pattern(group_id, members_map)
     if not pattern:
+        return None
+
+    return members_map, pattern
+
+
+async def handle_on_decorating_result(plugin: Any, event: AstrMessageEvent):
+    """在消息发送前处理，清洗消息格式并将文本中的 @名字 转换为飞书 At 组件。"""
+    if not plugin._is_lark_event(event):
         return
 
-    new_chain = []
+    result = event.get_result()
+    if result is None or not result.chain:
+        return
+
+    if result.result_content_type == ResultContentType.STREAMING_FINISH:
+        return
+
+    # 先只清洗文本（不构造中间组件），再一次遍历同时完成清洗结果写回与 @ 拆分
+    cleaned_texts: list[str | None] = []
+    has_at = False
     for comp in result.chain:
         if not isinstance(comp, Plain):
+            cleaned_texts.append(None)
+            continue
+        cleaned_text = plugin._clean_content(comp.text)
+        cleaned_text = plugin._clean_mention_markdown(cleaned_text)
+        if cleaned_text != comp.text:
+            logger.debug(
+                "[lark_enhance] Cleaned message: %.50s... -> %.50s...", comp.text, cleaned_text
+            )
+        cleaned_texts.append(cleaned_text)
+        # 绝大多数回复不含 @，可直接跳过群成员查询与正则匹配
+        has_at = has_at or "@" in cleaned_text
+
+    mention_context = None
+    if has_at and plugin._enable_mention_convert:
+        mention_context = await _get_mention_context(plugin, event)
+
+    new_chain = []
+    for comp, text in zip(result.chain, cleaned_texts):
+        if text is None:
             new_chain.append(comp)
             continue
 
-        text = comp.text
+        if mention_context is None:
+            new_chain.append(Plain(text))
+            continue
+
+        members_map, pattern = mention_context
         last_end = 0
         segments = []
 
         for match in pattern.finditer(text):
             name = match.group(1)
-            open_id = members_map.get(name)
-            if not open_id:
-                continue
+            # 正则由 members_map 的键构建，匹配到的名字必然存在且 open_id 非空
+            open_id = members_map[name]
 
             before_text = text[last_end: match.start()]
             if before_text:
@@ -428,11 +505,12 @@ async def handle_on_decorating_result(plugin: Any, event: AstrMessageEvent):
                     before_text += " "
                 segments.append(Plain(before_text))
 
+            # 每个位置使用独立的 At 组件，避免下游修改其中一个时影响其他位置
             segments.append(At(qq=open_id, name=name))
             last_end = match.end()
 
             logger.debug(
-                f"[lark_enhance] Converted @{name} to At component (open_id: {open_id})"
+                "[lark_enhance] Converted @%s to At component (open_id: %s)", name, open_id
             )
 
         if last_end < len(text):
@@ -444,6 +522,6 @@ async def handle_on_decorating_result(plugin: Any, event: AstrMessageEvent):
         if segments:
             new_chain.extend(segments)
         else:
-            new_chain.append(comp)
+            new_chain.append(Plain(text))
 
     result.chain = new_chain
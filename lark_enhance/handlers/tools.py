@@ -113,10 +113,15 @@ async def handle_lark_emoji_reply(plugin: Any, event: AstrMessageEvent, emoji: s
             last_response = response
 
             if response.success():
-                plugin._reacted_messages[message_id] = True
-
-                while len(plugin._reacted_messages) > 1000:
-                    plugin._reacted_messages.popitem(last=False)
+                reacted = plugin._reacted_messages
+                # 并发调用可能都通过了前面的检查，已记录的消息不再重复入队
+                if message_id not in reacted:
+                    order = plugin._reacted_order
+                    if len(order) == order.maxlen:
+                        # append 会挤出最早的一条，先从集合中同步移除
+                        reacted.discard(order[0])
+                    order.append(message_id)
+                    reacted.add(message_id)
 
                 if candidate != emoji:
                     logger.info(
@@ -165,7 +170,7 @@ async def handle_lark_save_memory(
     if not plugin._is_lark_event(event):
         return "不是飞书平台，无法使用记忆功能。"
 
-    if not plugin.config.get("enable_user_memory", True):
+    if not plugin._enable_user_memory:
         return "记忆功能未启用。"
 
     group_id = event.message_obj.group_id
@@ -181,7 +186,7 @@ async def handle_lark_save_memory(
         return f"无效的记忆范围。请使用: {', '.join(valid_scopes)}"
 
     if scope == "group":
-        max_per_group = plugin.config.get("memory_max_per_group", 30)
+        max_per_group = plugin._memory_max_per_group
         success = plugin._memory_store.add_group_memory(
             group_id=group_id,
             memory_type=memory_type,
@@ -194,7 +199,7 @@ async def handle_lark_save_memory(
         if not sender_id:
             return "无法获取用户信息。"
 
-        max_per_user = plugin.config.get("memory_max_per_user", 20)
+        max_per_user = plugin._memory_max_per_user
         success = plugin._memory_store.add_memory(
             group_id=group_id,
             user_id=sender_id,
@@ -218,7 +223,7 @@ async def handle_lark_list_memory(
     if not plugin._is_lark_event(event):
         return "不是飞书平台，无法使用记忆功能。"
 
-    if not plugin.config.get("enable_user_memory", True):
+    if not plugin._enable_user_memory:
         return "记忆功能未启用。"
 
     group_id = event.message_obj.group_id
@@ -278,7 +283,7 @@ async def handle_lark_forget_memory(
     if not plugin._is_lark_event(event):
         return "不是飞书平台，无法使用记忆功能。"
 
-    if not plugin.config.get("enable_user_memory", True):
+    if not plugin._enable_user_memory:
         return "记忆功能未启用。"
 
     group_id = event.message_obj.group_id
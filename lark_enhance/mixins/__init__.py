@@ -1,10 +1,11 @@
-from .history import HistoryMixin
+from .history import HistoryMixin, HistoryRecord
 from .lark_context import LarkContextMixin
 from .streaming import StreamingMixin, configure_streaming_runtime
 from .text import TextMixin
 
 __all__ = [
     "HistoryMixin",
+    "HistoryRecord",
     "LarkContextMixin",
     "StreamingMixin",
     "TextMixin",
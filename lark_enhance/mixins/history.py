@@ -1,12 +1,65 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import re
+import sys
 import time
 from collections import deque
+from typing import Any, NamedTuple
 
 from astrbot.api import logger
 
+from ..stores.file_writer import read_bytes
+
+
+# 复用单个紧凑编码器，历史文件整体以 bytes 写入
+_encode_history = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+class HistoryRecord(NamedTuple):
+    """群聊历史中的单条消息记录（内存中以紧凑元组存放）。"""
+
+    msg_id: str
+    time: str
+    sender: str
+    sender_id: str
+    content: str
+    # 预渲染的 prompt 注入行，仅存在于内存中，不写入持久化文件
+    line: str = ""
+
+    @classmethod
+    def create(
+        cls,
+        msg_id: str,
+        time: str,
+        sender: str,
+        sender_id: str,
+        content: str,
+    ) -> HistoryRecord:
+        """构造记录，并在写入时一次性渲染注入行：[时间] 昵称(open_id后4位): 内容。"""
+        sender_label = sender or "未知用户"
+        stripped_id = (sender_id or "").strip()
+        if stripped_id:
+            tail = stripped_id[-4:] if len(stripped_id) > 4 else stripped_id
+            sender_label = f"{sender_label}({tail})"
+        line = f"[{time}] {sender_label}: {content}"
+        # 发送者与时间在同群记录间大量重复，驻留后各记录共享同一字符串对象
+        return cls(
+            msg_id,
+            sys.intern(time),
+            sys.intern(sender),
+            sys.intern(sender_id),
+            content,
+            line,
+        )
+
+    def to_dict(self) -> dict:
+        """转换为持久化使用的 dict（不含预渲染行）。"""
+        data = self._asdict()
+        data.pop("line")
+        return data
+
 
 class HistoryMixin:
     """群历史与氛围分析相关逻辑。"""
@@ -15,23 +68,68 @@ class HistoryMixin:
         """程序退出时保存历史记录。"""
         if self._pending_save or self.group_history:
             self._save_history(force=True)
+        self._history_writer.flush()
+
+    def _format_time_hms(self, now: float) -> str:
+        """将时间戳格式化为 HH:MM:SS；同一秒内的多条消息复用上次的结果。"""
+        second = int(now)
+        if second != self._last_time_second:
+            self._last_time_second = second
+            self._last_time_str = time.strftime("%H:%M:%S", time.localtime(second))
+        return self._last_time_str
+
+    def _history_deque(self, group_id: str) -> deque[HistoryRecord]:
+        """获取群的历史队列，不存在时按当前窗口大小创建。"""
+        history = self.group_history.get(group_id)
+        if history is None:
+            history = self.group_history[group_id] = deque(maxlen=self._history_maxlen)
+        return history
 
     def _load_history(self):
         """从文件加载历史记录。"""
-        if not self._history_file.exists():
-            return
-
         try:
-            with open(self._history_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            # 直接打开文件，不存在时由异常得知，省去一次单独的 exists() 系统调用
+            data = json.loads(read_bytes(self._history_file))
 
             for group_id, items in data.items():
-                self.group_history[group_id] = deque(items, maxlen=self._history_maxlen)
+                if not isinstance(items, list):
+                    continue
+                history: deque[HistoryRecord] = deque(maxlen=self._history_maxlen)
+                for item in items:
+                    # 单条损坏的记录只跳过该条，不能让整个历史文件加载失败（随后的保存会覆盖文件）
+                    try:
+                        record = self._to_history_record(item)
+                    except Exception as e:
+                        logger.warning(
+                            f"[lark_enhance] Skipped malformed history record in {group_id}: {e}"
+                        )
+                        continue
+                    if record is not None:
+                        history.append(record)
+                self.group_history[group_id] = history
 
             logger.info(f"[lark_enhance] Loaded history for {len(data)} groups")
+        except FileNotFoundError:
+            return
         except Exception as e:
             logger.error(f"[lark_enhance] Failed to load history: {e}")
 
+    @staticmethod
+    def _to_history_record(item: Any) -> HistoryRecord | None:
+        """将持久化数据还原为 HistoryRecord（兼容旧版 dict 格式）。"""
+        # 文件中的字段可能为 null 或非字符串，驻留前统一转为 str
+        if isinstance(item, dict):
+            return HistoryRecord.create(
+                msg_id=str(item.get("msg_id") or ""),
+                time=str(item.get("time") or ""),
+                sender=str(item.get("sender") or "未知用户"),
+                sender_id=str(item.get("sender_id") or ""),
+                content=str(item.get("content") or ""),
+            )
+        if isinstance(item, (list, tuple)) and len(item) == 5:
+            return HistoryRecord.create(*(str(value or "") for value in item))
+        return None
+
     def _analyze_group_vibe(self, group_id: str, history_count: int = 12) -> tuple[str, str]:
         """基于近期群聊内容做轻量氛围识别。"""
         history_list = list(self.group_history.get(group_id, []))
@@ -39,7 +137,7 @@ class HistoryMixin:
             return "日常聊天", "语气自然、轻松一点，优先短句接话。"
 
         recent = history_list[-history_count:]
-        text_blob = "\n".join(item.get("content", "") for item in recent).lower()
+        text_blob = "\n".join(item.content for item in recent).lower()
 
         playful_score = len(re.findall(r"(哈哈|笑死|233|666|草|狗头|lol|hh|😂|🤣|😆)", text_blob))
         help_score = len(re.findall(r"(怎么|如何|帮|求助|报错|出错|不会|咋办|解决)", text_blob))
@@ -55,7 +153,7 @@ class HistoryMixin:
 
     def _try_capture_group_meme(self, group_id: str, sender_name: str, content: str):
         """从群消息中自动捕获明确声明的群梗。"""
-        if not self.config.get("enable_meme_memory", True):
+        if not self._enable_meme_memory:
             return
 
         if not group_id or not content:
@@ -74,7 +172,7 @@ class HistoryMixin:
             if not meme_content or len(meme_content) > 120:
                 return
 
-            max_memes = self.config.get("memory_max_per_group", 30)
+            max_memes = self._memory_max_per_group
             saved = self._memory_store.add_group_memory(
                 group_id=group_id,
                 memory_type="meme",
@@ -88,53 +186,71 @@ class HistoryMixin:
                 )
             return
 
-    def _format_history_sender(self, item: dict) -> str:
-        """格式化历史记录中的发送者标识：昵称(open_id后4位)。"""
-        sender_name = item.get("sender", "未知用户")
-        sender_id = (item.get("sender_id") or "").strip()
-        if not sender_id:
-            return sender_name
-        tail = sender_id[-4:] if len(sender_id) > 4 else sender_id
-        return f"{sender_name}({tail})"
-
     def _save_history(self, force: bool = False):
-        """将历史记录保存到文件（带防抖机制）。"""
-        now = time.time()
-
-        if not force and now - self._last_save_time < self._SAVE_DEBOUNCE:
+        """将历史记录保存到文件；非强制保存只标记待保存，由延迟任务合并写盘。"""
+        if not force:
             self._pending_save = True
-            return
+            self._save_requests += 1
+            if self._schedule_pending_save(self._save_interval):
+                return
 
         try:
             self._data_dir.mkdir(parents=True, exist_ok=True)
 
             data = {
-                group_id: list(items)
+                group_id: [record.to_dict() for record in items]
                 for group_id, items in self.group_history.items()
                 if items
             }
 
-            with open(self._history_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self._history_writer.submit(
+                self._history_file, _encode_history(data).encode("utf-8")
+            )
 
-            self._last_save_time = now
             self._pending_save = False
-            logger.debug(f"[lark_enhance] Saved history for {len(data)} groups")
+            logger.debug("[lark_enhance] Saved history for %d groups", len(data))
         except Exception as e:
             logger.error(f"[lark_enhance] Failed to save history: {e}")
 
+    def _schedule_pending_save(self, delay: float) -> bool:
+        """在窗口结束时写盘一次，同一窗口内的多次保存请求合并为一次写盘。
+
+        没有运行中的事件循环（无法延迟）时返回 False，由调用方直接写盘。
+        """
+        if self._save_task is not None and not self._save_task.done():
+            return True
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+
+        self._save_task = loop.create_task(self._delayed_flush(delay))
+        return True
+
+    async def _delayed_flush(self, delay: float):
+        """延迟 delay 秒后写入待保存的历史记录，并按本窗口的请求量调整下一个窗口。"""
+        await asyncio.sleep(delay)
+        # 一个窗口合并了多次请求说明正处于消息高峰，窗口逐步翻倍（上限 _SAVE_DEBOUNCE）；
+        # 空闲时恢复为最短窗口，让零星消息尽快落盘
+        if self._save_requests > 1:
+            self._save_interval = min(self._save_interval * 2, self._SAVE_DEBOUNCE)
+        else:
+            self._save_interval = self._SAVE_INTERVAL_MIN
+        self._save_requests = 0
+        self._flush_pending_save()
+
+    def _cancel_pending_save_task(self):
+        """取消尚未执行的延迟保存任务。"""
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
+        self._save_task = None
+
     def _flush_pending_save(self):
         """强制保存待保存的历史记录。"""
         if self._pending_save:
             self._save_history(force=True)
 
-    def _ensure_history_deque(self, group_id: str, history_count: int):
-        """确保 deque 长度符合配置。"""
-        if self.group_history[group_id].maxlen != history_count:
-            old_data = list(self.group_history[group_id])
-            self.group_history[group_id] = deque(old_data, maxlen=history_count)
-            self._history_maxlen = history_count
-
     def _clear_history_for_session(self, unified_msg_origin: str):
         """清空指定会话的历史记录。"""
         parts = unified_msg_origin.split(":")
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import time
 import uuid
-from typing import Any
+from typing import Any, Awaitable, Callable, TypeVar
 
 from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent
@@ -16,6 +17,8 @@ from lark_oapi.api.im.v1 import (
     GetMessageResourceRequest,
 )
 
+_T = TypeVar("_T")
+
 
 class LarkContextMixin:
     """飞书上下文信息查询与解析能力。"""
@@ -28,29 +31,65 @@ class LarkContextMixin:
     def _get_lark_client(event: AstrMessageEvent) -> Any | None:
         return getattr(event, "bot", None)
 
-    def _is_cache_valid(self, cache_time: float) -> bool:
+    def _cache_expiry(self) -> float:
+        """计算新写入缓存的过期时间点（单调时钟，不受系统时间调整影响）。"""
+        return time.monotonic() + self._CACHE_TTL
+
+    @staticmethod
+    def _is_cache_valid(expires_at: float) -> bool:
         """检查缓存是否有效。"""
-        return time.time() - cache_time < self._CACHE_TTL
+        return expires_at > time.monotonic()
+
+    async def _coalesce_request(
+        self,
+        key: tuple[str, str],
+        fetch: Callable[[], Awaitable[_T]],
+    ) -> _T:
+        """合并同一 key 的并发查询：只有第一个调用方发起请求，其余调用方等待同一结果。"""
+        inflight = self._inflight_requests
+        future = inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fetch())
+            inflight[key] = future
+
+            def _release(done: asyncio.Future, key=key):
+                if inflight.get(key) is done:
+                    del inflight[key]
+
+            future.add_done_callback(_release)
+        # 单个调用方被取消时不影响仍在等待同一结果的其他调用方
+        return await asyncio.shield(future)
 
     def _get_user_from_cache(self, open_id: str) -> str | None:
         """从缓存获取用户昵称（带 TTL 检查）。"""
-        if open_id in self.user_cache:
-            nickname, cache_time = self.user_cache[open_id]
-            if self._is_cache_valid(cache_time):
-                self.user_cache.move_to_end(open_id)
-                return nickname
-            del self.user_cache[open_id]
+        entry = self.user_cache.get(open_id)
+        if entry is None:
+            return None
+        nickname, expires_at = entry
+        if self._is_cache_valid(expires_at):
+            return nickname
+        del self.user_cache[open_id]
         return None
 
     def _set_user_cache(self, open_id: str, nickname: str):
-        """设置用户缓存（带容量限制）。"""
-        if open_id in self.user_cache:
-            del self.user_cache[open_id]
-
-        while len(self.user_cache) >= self._USER_CACHE_MAX_SIZE:
-            self.user_cache.popitem(last=False)
-
-        self.user_cache[open_id] = (nickname, time.time())
+        """设置用户缓存（带容量限制，按插入顺序淘汰最早的条目）。"""
+        user_cache = self.user_cache
+        if open_id not in user_cache:
+            while len(user_cache) >= self._USER_CACHE_MAX_SIZE:
+                del user_cache[next(iter(user_cache))]
+
+        user_cache[open_id] = (nickname, self._cache_expiry())
+
+    def _set_user_cache_entries(self, entries: list[tuple[str, str]]):
+        """批量写入用户缓存，entries 为 (昵称, open_id)；整批共用同一个过期时间。"""
+        user_cache = self.user_cache
+        max_size = self._USER_CACHE_MAX_SIZE
+        expires_at = self._cache_expiry()
+        for nickname, open_id in entries:
+            if open_id not in user_cache:
+                while len(user_cache) >= max_size:
+                    del user_cache[next(iter(user_cache))]
+            user_cache[open_id] = (nickname, expires_at)
 
     async def _get_user_nickname(
         self,
@@ -63,10 +102,15 @@ class LarkContextMixin:
             return cached
 
         if event and open_id == event.get_self_id():
-            bot_name = self.config.get("bot_name", "助手")
+            bot_name = self._bot_name
             self._set_user_cache(open_id, bot_name)
             return bot_name
 
+        return await self._coalesce_request(
+            ("user", open_id), lambda: self._fetch_user_nickname(lark_client, open_id)
+        )
+
+    async def _fetch_user_nickname(self, lark_client: Any, open_id: str) -> str | None:
         logger.debug(f"[lark_enhance] Querying Lark user info for open_id: {open_id}")
 
         try:
@@ -106,9 +150,14 @@ class LarkContextMixin:
     async def _get_group_info(self, lark_client: Any, chat_id: str) -> dict | None:
         """获取群组信息（名称和描述）。"""
         if chat_id in self.group_info_cache:
-            if self._is_cache_valid(self._group_info_cache_time.get(chat_id, 0)):
+            if self._is_cache_valid(self._group_info_cache_expiry.get(chat_id, 0)):
                 return self.group_info_cache[chat_id]
 
+        return await self._coalesce_request(
+            ("group_info", chat_id), lambda: self._fetch_group_info(lark_client, chat_id)
+        )
+
+    async def _fetch_group_info(self, lark_client: Any, chat_id: str) -> dict | None:
         logger.debug(f"[lark_enhance] Querying Lark group info for chat_id: {chat_id}")
 
         try:
@@ -129,7 +178,7 @@ class LarkContextMixin:
                     "description": getattr(response.data, "description", None),
                 }
                 self.group_info_cache[chat_id] = group_info
-                self._group_info_cache_time[chat_id] = time.time()
+                self._group_info_cache_expiry[chat_id] = self._cache_expiry()
                 return group_info
             logger.warning(f"获取飞书群组信息失败: {response.code} - {response.msg}")
         except Exception as e:
@@ -139,10 +188,15 @@ class LarkContextMixin:
 
     async def _get_group_members(self, lark_client: Any, chat_id: str) -> dict[str, str]:
         """获取群成员列表，返回 nickname -> open_id 的映射。"""
-        if chat_id in self.group_members_cache:
-            if self._is_cache_valid(self._group_members_cache_time.get(chat_id, 0)):
-                return self.group_members_cache[chat_id]
+        # 过期时间与成员映射总是同时写入，有效的过期时间即代表缓存存在
+        if self._is_cache_valid(self._group_members_cache_expiry.get(chat_id, 0)):
+            return self.group_members_cache[chat_id]
 
+        return await self._coalesce_request(
+            ("group_members", chat_id), lambda: self._fetch_group_members(lark_client, chat_id)
+        )
+
+    async def _fetch_group_members(self, lark_client: Any, chat_id: str) -> dict[str, str]:
         logger.debug(f"[lark_enhance] Querying Lark group members for chat_id: {chat_id}")
         members_map: dict[str, str] = {}
 
@@ -154,41 +208,48 @@ class LarkContextMixin:
                 )
                 return members_map
 
-            page_token = None
-            while True:
+            def fetch_page(page_token: str | None):
                 request_builder = (
                     GetChatMembersRequest.builder()
                     .chat_id(chat_id)
                     .member_id_type("open_id")
                     .page_size(100)
                 )
-
                 if page_token:
                     request_builder = request_builder.page_token(page_token)
+                return asyncio.ensure_future(im.v1.chat_members.aget(request_builder.build()))
 
-                request = request_builder.build()
-                response = await im.v1.chat_members.aget(request)
-
-                if not response.success():
-                    logger.warning(f"获取飞书群成员失败: {response.code} - {response.msg}")
-                    break
-
-                if response.data and response.data.items:
-                    for member in response.data.items:
-                        member_id = getattr(member, "member_id", None)
-                        name = getattr(member, "name", None)
-                        if member_id and name:
-                            members_map[name] = member_id
-                            self._set_user_cache(member_id, name)
-
-                if response.data and response.data.has_more and response.data.page_token:
-                    page_token = response.data.page_token
-                else:
-                    break
+            # 分页游标只能从上一页响应中取得，无法并发拉取所有页；
+            # 拿到游标后立即发起下一页请求，与当前页的解析重叠进行
+            next_page = fetch_page(None)
+            try:
+                while next_page is not None:
+                    response = await next_page
+                    next_page = None
+
+                    if not response.success():
+                        logger.warning(f"获取飞书群成员失败: {response.code} - {response.msg}")
+                        break
+
+                    data = response.data
+                    if data and data.has_more and data.page_token:
+                        next_page = fetch_page(data.page_token)
+
+                    if data and data.items:
+                        page_members = [
+                            (name, member_id)
+                            for member in data.items
+                            if (member_id := getattr(member, "member_id", None))
+                            and (name := getattr(member, "name", None))
+                        ]
+                        members_map.update(page_members)
+                        self._set_user_cache_entries(page_members)
+            finally:
+                if next_page is not None:
+                    next_page.cancel()
 
             self.group_members_cache[chat_id] = members_map
-            self._group_members_cache_time[chat_id] = time.time()
-            self._mention_pattern_cache.pop(chat_id, None)
+            self._group_members_cache_expiry[chat_id] = self._cache_expiry()
             logger.info(
                 f"[lark_enhance] Loaded {len(members_map)} members for group {chat_id}"
             )
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import inspect
-from typing import Any
 
 from astrbot.api import logger
 from astrbot.api.message_components import Plain
@@ -78,16 +77,22 @@ class StreamingMixin:
                     logger.warning("[lark_enhance] Failed to create streaming card, using fallback")
                     return await _original_lark_send_streaming(event_self, generator, use_fallback)
 
+                # 逐片段追加到列表，只在推送和结束时拼接，避免长回复的反复字符串拷贝
+                chunks: list[str] = []
                 full_content = ""
                 try:
                     async for chain in generator:
                         if chain and chain.chain:
                             for comp in chain.chain:
-                                if isinstance(comp, Plain):
-                                    full_content += comp.text
+                                # Plain 为叶子组件类，精确类型比较比 isinstance 更省
+                                if type(comp) is Plain:
+                                    chunks.append(comp.text)
                                 elif hasattr(comp, "type"):
-                                    full_content += f" [{comp.type}] "
-                            await streaming_card.update_card(full_content)
+                                    chunks.append(f" [{comp.type}] ")
+                            streaming_card.push_chunks(chunks)
+
+                    await streaming_card.stop_flusher()
+                    full_content = "".join(chunks)
 
                     if _clean_content_func:
                         full_content = _clean_content_func(full_content)
@@ -105,10 +110,14 @@ class StreamingMixin:
 
                 except Exception as e:
                     logger.error(f"[lark_enhance] Streaming card error: {e}")
+                    await streaming_card.stop_flusher()
+                    full_content = full_content or "".join(chunks)
                     if full_content:
                         await streaming_card.finalize_card(full_content + "\n\n*（输出中断）*")
                     else:
                         await streaming_card.delete_card()
+                finally:
+                    streaming_card.cancel_flusher()
 
             LarkMessageEvent.send_streaming = patched_send_streaming
             logger.info("[lark_enhance] Streaming card patch applied successfully")
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
+import functools
 import json
 import re
-import time
 from typing import Any
 
 
@@ -17,20 +17,47 @@ class TextMixin:
         re.compile(r"~~\s*(@[^\s~]+)\s*~~"),
         re.compile(r"`\s*(@[^\s`]+)\s*`"),
     ]
+    # 上述模式用到的全部 Markdown 包裹符号
+    _MD_SIGILS = frozenset("*_~`")
+    # 序列化的组件列表必然以对象元素开头，只需检查开头几个字符
+    _COMPONENT_LIST_PREFIX = re.compile(r"\[\s*\{")
+    _VALID_COMPONENT_TYPES = frozenset(
+        {"text", "image", "at", "plain", "face", "record", "video", "file"}
+    )
 
     def _clean_content(self, content_str: str) -> str:
         """清洗消息内容，仅处理 AstrBot 序列化的消息组件格式。"""
         if not content_str:
             return content_str
 
+        # 常见的普通回复首字符不是 "["、首尾也没有空白，strip() 不会改变它，可直接返回
+        first = content_str[0]
+        if first != "[" and not first.isspace() and not content_str[-1].isspace():
+            return content_str
+
         content_str = content_str.strip()
 
         if len(content_str) > self._CLEAN_CONTENT_MAX_LEN:
             return content_str
 
-        if not content_str.startswith("["):
+        # 组件列表形如 [{..."type"...}]；代码片段、普通列表等不符合该形状的文本无需进入 JSON 解析
+        if not self._COMPONENT_LIST_PREFIX.match(content_str) or '"type"' not in content_str:
             return content_str
 
+        # 同一段回复会先在发送前清洗、发送后记录历史时再清洗一次，缓存解析结果
+        cache = self._clean_content_cache
+        cached = cache.get(content_str)
+        if cached is not None:
+            return cached
+
+        result = self._parse_serialized_components(content_str)
+        if len(cache) >= self._CLEAN_CONTENT_CACHE_SIZE:
+            del cache[next(iter(cache))]
+        cache[content_str] = result
+        return result
+
+    def _parse_serialized_components(self, content_str: str) -> str:
+        """解析序列化的消息组件列表并提取文本，不是组件格式时原样返回。"""
         try:
             data = json.loads(content_str)
         except json.JSONDecodeError:
@@ -50,69 +77,121 @@ class TextMixin:
         if not data:
             return False
 
-        valid_types = {"text", "image", "at", "plain", "face", "record", "video", "file"}
+        valid_types = self._VALID_COMPONENT_TYPES
         for item in data:
-            if isinstance(item, dict) and "type" in item:
-                type_value = item.get("type", "").lower()
-                if type_value in valid_types:
+            if isinstance(item, dict):
+                type_value = item.get("type")
+                if not isinstance(type_value, str):
+                    continue
+                # 类型名通常已是小写，只在直接命中失败时才调用 lower()
+                if type_value in valid_types or type_value.lower() in valid_types:
                     return True
 
         return False
 
     def _extract_text_from_data(self, data: Any, depth: int = 0) -> str:
-        """递归从 list/dict 中提取 text 字段。"""
-        if depth > 10:
-            return ""
-
-        texts = []
-        if isinstance(data, list):
-            for item in data:
-                result = self._extract_text_from_data(item, depth + 1)
-                if result:
-                    texts.append(result)
-        elif isinstance(data, dict):
-            if "text" in data:
-                text_value = data["text"]
-                if isinstance(text_value, str):
-                    if text_value.strip().startswith("[") or text_value.strip().startswith("{"):
-                        return self._clean_content(text_value)
-                    return text_value
-                return str(text_value)
-            for value in data.values():
-                if isinstance(value, (list, dict)):
-                    result = self._extract_text_from_data(value, depth + 1)
-                    if result:
-                        texts.append(result)
-        elif isinstance(data, str):
-            if data.strip().startswith("[") or data.strip().startswith("{"):
-                return self._clean_content(data)
-            return data
-
-        return "".join(texts)
+        """从 list/dict 中提取 text 字段（迭代深度优先遍历，结果只在最后拼接一次）。"""
+        parts: list[str] = []
+        stack: list[tuple[Any, int]] = [(data, depth)]
+        while stack:
+            node, node_depth = stack.pop()
+            if node_depth > 10:
+                continue
+
+            if isinstance(node, list):
+                # 逆序压栈，保证按原顺序出栈
+                stack.extend((item, node_depth + 1) for item in reversed(node))
+                continue
+
+            if isinstance(node, dict):
+                if "text" not in node:
+                    stack.extend(
+                        (value, node_depth + 1)
+                        for value in reversed(node.values())
+                        if isinstance(value, (list, dict))
+                    )
+                    continue
+                node = node["text"]
+                if not isinstance(node, str):
+                    parts.append(str(node))
+                    continue
+            elif not isinstance(node, str):
+                continue
+
+            # 只有以空白开头时才需要 lstrip() 找到首个有效字符
+            head = node[:1]
+            if head.isspace():
+                head = node.lstrip()[:1]
+            if head == "[":
+                # 文本本身可能又是序列化的组件列表，交给 _clean_content 单独解析（结果有缓存）
+                parts.append(self._clean_content(node))
+            elif head == "{":
+                # 以 { 开头的文本不会被识别为组件列表，_clean_content 对它只做 strip()
+                parts.append(node.strip())
+            else:
+                parts.append(node)
+
+        return "".join(parts)
 
     def _clean_mention_markdown(self, text: str) -> str:
         """清理 @ 提及周围的 Markdown 格式符号。"""
+        # 所有模式都要求同时包含 @ 和包裹符号，缺任一项的文本（绝大多数回复）无需逐个跑正则
+        if "@" not in text or self._MD_SIGILS.isdisjoint(text):
+            return text
         result = text
         for pattern in self._MENTION_MARKDOWN_PATTERNS:
             result = pattern.sub(r"\1", result)
         return result
 
+    @staticmethod
+    def _build_trie_regex(names: list[str]) -> str:
+        """将名字列表构建为按公共前缀合并的正则（前缀树形式）。
+
+        相比直接 `|` 拼接所有名字，匹配时每个位置只需沿前缀树逐字符分支，
+        不会随成员数量线性回溯；可选分支为贪婪匹配，仍优先命中最长的名字。
+        """
+        trie: dict = {}
+        for name in names:
+            node = trie
+            for char in name:
+                node = node.setdefault(char, {})
+            node[""] = {}
+
+        def render(node: dict) -> str:
+            is_end = "" in node
+            branches = [
+                re.escape(char) + render(child) for char, child in node.items() if char
+            ]
+            if not branches:
+                return ""
+            if len(branches) == 1 and not is_end:
+                return branches[0]
+            body = "(?:" + "|".join(branches) + ")"
+            return body + "?" if is_end else body
+
+        return render(trie)
+
     def _get_mention_pattern(self, group_id: str, members_map: dict[str, str]) -> re.Pattern | None:
-        """获取或创建 @ 提及匹配的正则表达式（带缓存）。"""
-        if group_id in self._mention_pattern_cache:
-            pattern, cache_time = self._mention_pattern_cache[group_id]
-            if self._is_cache_valid(cache_time):
-                return pattern
+        """获取或创建 @ 提及匹配的正则表达式（按成员名单缓存）。"""
+        cached = self._mention_pattern_cache.get(group_id)
+        if cached is not None and cached[0] is members_map:
+            return cached[2]
 
         if not members_map:
             return None
 
-        sorted_names = sorted(members_map.keys(), key=len, reverse=True)
-        if not sorted_names:
-            return None
+        # 成员缓存按 TTL 刷新时会生成新的 dict，但名单通常没变，比较名字集合即可复用旧正则
+        names = frozenset(members_map)
+        if cached is not None and cached[1] == names:
+            pattern = cached[2]
+        else:
+            pattern = _compile_mention_pattern(names)
+        self._mention_pattern_cache[group_id] = (members_map, names, pattern)
+        return pattern
 
-        escaped_names = [re.escape(name) for name in sorted_names]
-        pattern = re.compile(r"@(" + "|".join(escaped_names) + r")")
 
-        self._mention_pattern_cache[group_id] = (pattern, time.time())
-        return pattern
+@functools.lru_cache(maxsize=64)
+def _compile_mention_pattern(names: frozenset[str]) -> re.Pattern:
+    """按名字集合编译 @ 提及正则；成员相同的群（或名单变回旧值时）共享同一个编译结果。"""
+    # 前缀树正则本身保证最长匹配，无需再按长度排序
+    return re.compile(r"@(" + TextMixin._build_trie_regex(list(names)) + r")")
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 import json
-import time
 import uuid
+from collections import deque
 from typing import Any
 
 from astrbot.api import logger
@@ -16,6 +17,10 @@ from lark_oapi.api.im.v1 import (
 )
 
 
+# 复用单个编码器，避免每次卡片更新都构造新的 JSONEncoder
+_encode_card = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
 async def empty_generator():
     """空的异步生成器，用于调用父类方法。"""
     return
@@ -25,6 +30,11 @@ async def empty_generator():
 class LarkCardBuilder:
     """飞书消息卡片构建器 - 提供优雅的链式 API 构建卡片。"""
 
+    __slots__ = ("_elements", "_config")
+
+    # is_finished -> (正文前缀, 正文后缀, 空正文卡片)，首次使用时由 build() 生成
+    _streaming_templates: dict[bool, tuple[str, str, str]] = {}
+
     def __init__(self):
         self._elements: list[dict] = []
         self._config = {"wide_screen_mode": True}
@@ -59,24 +69,53 @@ class LarkCardBuilder:
                 ],
             },
         }
-        return json.dumps(card, ensure_ascii=False)
+        return _encode_card(card)
+
+    @classmethod
+    def _streaming_template(cls, is_finished: bool) -> tuple[str, str, str]:
+        """获取流式卡片的 JSON 模板：以占位符构建一次，按占位符切分出前后缀。"""
+        template = cls._streaming_templates.get(is_finished)
+        if template is None:
+            placeholder = "\x00"
+            builder = cls().markdown(placeholder)
+            empty_builder = cls()
+            if not is_finished:
+                builder.loading_indicator()
+                empty_builder.loading_indicator()
+            prefix, suffix = builder.build().split(_encode_card(placeholder))
+            template = (prefix, suffix, empty_builder.build())
+            cls._streaming_templates[is_finished] = template
+        return template
 
     @classmethod
     def streaming_card(cls, text: str, is_finished: bool = False) -> str:
         """快速创建流式输出卡片。"""
-        builder = cls()
-        if text:
-            builder.markdown(text)
-        if not is_finished:
-            builder.loading_indicator()
-        return builder.build()
+        prefix, suffix, empty_card = cls._streaming_template(is_finished)
+        if not text:
+            return empty_card
+        # 卡片结构固定不变，每次只需转义正文
+        return prefix + _encode_card(text) + suffix
 
 
 class LarkStreamingCard:
     """飞书流式卡片处理器，用于实现打字机效果。"""
 
+    __slots__ = (
+        "lark_client",
+        "chat_id",
+        "reply_to_message_id",
+        "card_message_id",
+        "_content_buffer",
+        "_pending_chunks",
+        "_content_event",
+        "_closed_event",
+        "_flusher_task",
+    )
+
     UPDATE_INTERVAL = 0.3
-    MIN_UPDATE_CHARS = 5
+    # 预生成的请求幂等 uuid，按需批量补充
+    _UUID_POOL_SIZE = 64
+    _uuid_pool: deque[str] = deque()
 
     def __init__(self, lark_client: Any, chat_id: str, reply_to_message_id: str):
         self.lark_client = lark_client
@@ -84,8 +123,18 @@ class LarkStreamingCard:
         self.reply_to_message_id = reply_to_message_id
         self.card_message_id: str | None = None
         self._content_buffer: str = ""
-        self._last_update_time: float = 0
-        self._last_update_length: int = 0
+        # 流式推送：生成器只提交累积的文本片段，由后台任务按 UPDATE_INTERVAL 合并为一次 patch
+        self._pending_chunks: list[str] = []
+        self._content_event = asyncio.Event()
+        self._closed_event = asyncio.Event()
+        self._flusher_task: asyncio.Task | None = None
+
+    @classmethod
+    def _next_uuid(cls) -> str:
+        """从预生成池中取出一个 uuid 字符串，池空时批量补充。"""
+        if not cls._uuid_pool:
+            cls._uuid_pool.extend(str(uuid.uuid4()) for _ in range(cls._UUID_POOL_SIZE))
+        return cls._uuid_pool.popleft()
 
     async def create_initial_card(self) -> bool:
         """创建初始卡片消息。"""
@@ -99,7 +148,7 @@ class LarkStreamingCard:
                     ReplyMessageRequestBody.builder()
                     .content(content)
                     .msg_type("interactive")
-                    .uuid(str(uuid.uuid4()))
+                    .uuid(self._next_uuid())
                     .reply_in_thread(False)
                     .build()
                 )
@@ -115,7 +164,7 @@ class LarkStreamingCard:
             if response.success() and response.data:
                 self.card_message_id = response.data.message_id
                 logger.debug(
-                    f"[lark_enhance] Created streaming card: {self.card_message_id}"
+                    "[lark_enhance] Created streaming card: %s", self.card_message_id
                 )
                 return True
 
@@ -127,19 +176,53 @@ class LarkStreamingCard:
             logger.error(f"[lark_enhance] Create card exception: {e}")
             return False
 
-    async def update_card(self, text: str, force: bool = False) -> bool:
-        """更新卡片内容。"""
+    def push_chunks(self, chunks: list[str]):
+        """提交累积中的文本片段列表，不等待网络请求；首次提交时启动后台推送任务。
+
+        列表按引用保存、由调用方继续追加，拼接推迟到真正推送时进行，每个时间窗口只拼接一次。
+        """
+        if not self.card_message_id or self._closed_event.is_set():
+            return
+        self._pending_chunks = chunks
+        self._content_event.set()
+        if self._flusher_task is None:
+            self._flusher_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        """后台推送循环：每个时间窗口内到达的多次提交只推送最后一次的内容。"""
+        while True:
+            await self._content_event.wait()
+            if self._closed_event.is_set():
+                return
+            self._content_event.clear()
+            await self.update_card("".join(self._pending_chunks))
+            try:
+                await asyncio.wait_for(self._closed_event.wait(), self.UPDATE_INTERVAL)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop_flusher(self):
+        """停止后台推送；等待进行中的 patch 完成，保证其不会晚于最终卡片到达。"""
+        self._closed_event.set()
+        self._content_event.set()
+        task, self._flusher_task = self._flusher_task, None
+        if task is not None:
+            await task
+
+    def cancel_flusher(self):
+        """直接取消后台推送任务（用于外层被取消等无法等待的场景）。"""
+        self._closed_event.set()
+        task, self._flusher_task = self._flusher_task, None
+        if task is not None:
+            task.cancel()
+
+    async def update_card(self, text: str) -> bool:
+        """更新卡片内容（调用频率由后台推送循环按 UPDATE_INTERVAL 控制）。"""
         if not self.card_message_id:
             return False
 
         self._content_buffer = text
-        now = time.time()
-
-        if not force:
-            time_elapsed = now - self._last_update_time
-            chars_added = len(text) - self._last_update_length
-            if time_elapsed < self.UPDATE_INTERVAL and chars_added < self.MIN_UPDATE_CHARS:
-                return True
 
         try:
             content = LarkCardBuilder.streaming_card(text, is_finished=False)
@@ -154,8 +237,6 @@ class LarkStreamingCard:
             response = await self.lark_client.im.v1.message.apatch(request)
 
             if response.success():
-                self._last_update_time = now
-                self._last_update_length = len(text)
                 return True
 
             logger.warning(
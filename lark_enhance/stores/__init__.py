@@ -1,3 +1,4 @@
+from .file_writer import BackgroundFileWriter, read_bytes, write_bytes_atomic
 from .user_memory_store import UserMemoryStore
 
-__all__ = ["UserMemoryStore"]
+__all__ = ["BackgroundFileWriter", "UserMemoryStore", "read_bytes", "write_bytes_atomic"]
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from astrbot.api import logger
+
+
+def read_bytes(path: Path) -> bytes:
+    """按文件大小一次性读出全部内容，绕过 io 缓冲层。"""
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        size = os.fstat(fd).st_size
+        chunks = []
+        while True:
+            # 文件可能在读取期间变长，读到 EOF 为止
+            chunk = os.read(fd, max(size, 65536))
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+    finally:
+        os.close(fd)
+
+
+def write_bytes_atomic(path: Path, data: bytes):
+    """先写临时文件并刷盘，再原子替换，避免进程中断时留下半截 JSON。"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    fd = os.open(
+        tmp_path,
+        os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0),
+        0o644,
+    )
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
+
+
+class BackgroundFileWriter:
+    """后台文件写入器：在线程池中落盘，不阻塞事件循环。
+
+    同一路径只保留最新一份待写内容，写入按取出顺序串行执行，
+    因此较旧的内容不会覆盖较新的内容。没有运行中的事件循环时直接同步写入。
+    与上次成功写入的内容完全相同时跳过本次写盘。
+    """
+
+    def __init__(self):
+        self._pending: dict[Path, bytes] = {}
+        # 已被取出、正在写入的内容；与 _pending 一样只在持有 _state_lock 时访问
+        self._in_flight: dict[Path, bytes] = {}
+        self._scheduled: set[Path] = set()
+        self._state_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # 各路径最近一次成功写入内容的摘要，仅在持有 _write_lock 时访问
+        self._written_digests: dict[Path, bytes] = {}
+
+    def submit(self, path: Path, data: bytes):
+        """提交待写内容；同一路径尚未落盘的旧内容会被直接替换。"""
+        with self._state_lock:
+            self._pending[path] = data
+            if path in self._scheduled:
+                return
+            self._scheduled.add(path)
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_latest(path)
+            return
+
+        loop.run_in_executor(None, self._write_latest, path)
+
+    def peek(self, path: Path) -> bytes | None:
+        """返回该路径尚未落盘（待写或正在写入）的最新内容，没有时返回 None。
+
+        只持有状态锁，不会等待进行中的写盘，可在事件循环中调用。
+        """
+        with self._state_lock:
+            data = self._pending.get(path)
+            if data is None:
+                data = self._in_flight.get(path)
+            return data
+
+    def flush(self, path: Path | None = None):
+        """同步写出尚未落盘的内容（会等待进行中的写入完成），可只针对单个路径。"""
+        if path is not None:
+            self._write_latest(path)
+            return
+        with self._state_lock:
+            paths = list(self._pending)
+        for pending_path in paths:
+            self._write_latest(pending_path)
+        # 已被后台线程取走、正在写入的内容不在待写表中，需等写锁释放才算落盘完成
+        with self._write_lock:
+            pass
+
+    def _write_latest(self, path: Path):
+        with self._write_lock:
+            with self._state_lock:
+                self._scheduled.discard(path)
+                data = self._pending.pop(path, None)
+                if data is None:
+                    return
+                self._in_flight[path] = data
+            try:
+                digest = hashlib.blake2b(data, digest_size=16).digest()
+                if self._written_digests.get(path) == digest:
+                    return
+                write_bytes_atomic(path, data)
+                self._written_digests[path] = digest
+            except Exception as e:
+                logger.error(f"[lark_enhance] Failed to write {path.name}: {e}")
+            finally:
+                with self._state_lock:
+                    self._in_flight.pop(path, None)
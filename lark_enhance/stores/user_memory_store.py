@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+import bisect
 import json
 import time
 import uuid
@@ -8,66 +10,297 @@ from pathlib import Path
 
 from astrbot.api import logger
 
+from .file_writer import BackgroundFileWriter, read_bytes
+
+
+# 复用单个紧凑编码器（文件只供程序读取，不做缩进美化）；文件整体以 bytes 读写
+_encode_json = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
 
 class UserMemoryStore:
-    """用户记忆存储管理器 - 按群隔离的用户记忆系统。"""
+    """用户记忆存储管理器 - 按群隔离的用户记忆系统。
+
+    内存中的每个记忆列表始终按（类型优先级, 更新时间倒序）排列，
+    写入时维护顺序，查询时直接切片，无需每次排序。
+    """
+
+    __slots__ = (
+        "_data_dir",
+        "_cache",
+        "_writer",
+        "_known_empty_groups",
+        "_dirty_groups",
+        "_flush_handle",
+    )
 
     TYPE_PRIORITY = {"instruction": 0, "preference": 1, "fact": 2, "meme": 3}
+    _VALID_TYPES = frozenset(TYPE_PRIORITY)
     _CACHE_MAX_SIZE = 100
+    # 修改后延迟落盘的时间（秒），窗口内同一群的多次修改只编码、写入一次
+    _SAVE_DELAY = 2
+    _FILENAME_TRANS = str.maketrans({"/": "_", "\\": "_"})
 
     def __init__(self, data_dir: Path):
         self._data_dir = data_dir / "user_memory"
         self._data_dir.mkdir(parents=True, exist_ok=True)
         self._cache: OrderedDict[str, dict] = OrderedDict()
+        self._writer = BackgroundFileWriter()
+        self._known_empty_groups: set[str] = set()
+        self._dirty_groups: set[str] = set()
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+    @classmethod
+    def _sort_key(cls, mem: dict) -> tuple[int, float]:
+        return (cls.TYPE_PRIORITY.get(mem["type"], 99), -mem["updated_at"])
+
+    @classmethod
+    def _type_range(cls, memories: list[dict], memory_type: str) -> tuple[int, int]:
+        """列表按类型优先级排列，同类型记忆是连续的一段，二分定位其 [start, end) 区间。"""
+        priority = cls.TYPE_PRIORITY[memory_type]
+        start = bisect.bisect_left(
+            memories, (priority, float("-inf")), key=cls._sort_key
+        )
+        end = bisect.bisect_left(
+            memories, (priority + 1, float("-inf")), key=cls._sort_key, lo=start
+        )
+        return start, end
+
+    @staticmethod
+    def _oldest_index(memories: list[dict]) -> int:
+        """返回最早更新的记忆下标；时间相同时取列表中靠后的一条（与按时间倒序稳定截断一致）。"""
+        return min(
+            range(len(memories) - 1, -1, -1), key=lambda i: memories[i]["updated_at"]
+        )
+
+    def _sort_loaded_data(self, data: dict):
+        """从文件加载后整理一次记忆顺序（旧文件未按优先级排列）。"""
+        for user_data in data.get("users", {}).values():
+            user_data.get("memories", []).sort(key=self._sort_key)
+        if "group_memories" in data:
+            data["group_memories"].sort(key=self._sort_key)
 
     def _get_file_path(self, group_id: str) -> Path:
-        safe_id = group_id.replace("/", "_").replace("\\", "_")
+        safe_id = group_id.translate(self._FILENAME_TRANS)
         return self._data_dir / f"{safe_id}.json"
 
-    def _load_group_data(self, group_id: str) -> dict:
+    def _peek_group_data(self, group_id: str) -> dict | None:
+        """只读访问群数据；该群从未保存过记忆时返回 None，不创建空数据、不占用缓存。"""
         if group_id in self._cache:
             self._cache.move_to_end(group_id)
             return self._cache[group_id]
 
+        # 已确认磁盘上没有文件的群，直接跳过文件系统访问
+        if group_id in self._known_empty_groups:
+            return None
+
         file_path = self._get_file_path(group_id)
-        if file_path.exists():
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self._set_cache(group_id, data)
-                    return data
-            except Exception as e:
-                logger.error(f"[lark_enhance] Failed to load memory for group {group_id}: {e}")
-
-        data = {"group_id": group_id, "users": {}, "updated_at": time.time()}
+        try:
+            # 该群可能刚被淘汰出缓存且仍有写入未落盘，此时直接使用待写内容，不等待写盘
+            payload = self._writer.peek(file_path)
+            if payload is None:
+                data = self._read_group_file(file_path)
+            else:
+                data = json.loads(payload)
+                self._sort_loaded_data(data)
+        except Exception as e:
+            logger.error(f"[lark_enhance] Failed to load memory for group {group_id}: {e}")
+            data = None
+
+        if data is None:
+            self._known_empty_groups.add(group_id)
+            return None
         self._set_cache(group_id, data)
         return data
 
+    def _read_group_file(self, file_path: Path) -> dict | None:
+        """读取并整理单个群的记忆文件，文件不存在时返回 None；不访问缓存，可在线程池中执行。"""
+        # 直接打开文件，不存在时由异常得知，省去一次单独的 exists() 系统调用
+        try:
+            data = json.loads(read_bytes(file_path))
+        except FileNotFoundError:
+            return None
+        self._sort_loaded_data(data)
+        return data
+
+    async def warm_cache(self, group_ids: list[str]):
+        """在线程池中并发预读多个群的记忆文件，避免首次访问时在事件循环里同步读盘。"""
+        pending = [
+            group_id
+            for group_id in group_ids
+            if group_id not in self._cache and group_id not in self._known_empty_groups
+        ][: self._CACHE_MAX_SIZE]
+        if not pending:
+            return
+
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(None, self._read_group_file, self._get_file_path(group_id))
+                for group_id in pending
+            ),
+            return_exceptions=True,
+        )
+
+        for group_id, result in zip(pending, results):
+            # 预读期间该群可能已被正常路径加载或修改，以内存中的状态为准
+            if group_id in self._cache or group_id in self._known_empty_groups:
+                continue
+            if isinstance(result, BaseException):
+                logger.error(f"[lark_enhance] Failed to load memory for group {group_id}: {result}")
+            elif result is None:
+                self._known_empty_groups.add(group_id)
+            else:
+                self._set_cache(group_id, result)
+
+        logger.debug("[lark_enhance] Warmed memory cache for %d groups", len(pending))
+
+    def _load_group_data(self, group_id: str) -> dict:
+        data = self._peek_group_data(group_id)
+        if data is None:
+            data = {"group_id": group_id, "users": {}, "updated_at": time.time()}
+            self._set_cache(group_id, data)
+        return data
+
     def _set_cache(self, group_id: str, data: dict):
-        if group_id in self._cache:
-            del self._cache[group_id]
+        self._cache.pop(group_id, None)
 
         while len(self._cache) >= self._CACHE_MAX_SIZE:
-            self._cache.popitem(last=False)
+            evicted_id, evicted_data = self._cache.popitem(last=False)
+            # 被淘汰的群若还有未落盘的修改，立即提交，避免丢失
+            if evicted_id in self._dirty_groups:
+                self._dirty_groups.discard(evicted_id)
+                self._submit_group_data(evicted_id, evicted_data)
 
         self._cache[group_id] = data
 
     def _save_group_data(self, group_id: str):
-        if group_id not in self._cache:
+        """标记群数据待保存；有事件循环时合并到 _SAVE_DELAY 秒后统一编码写入。"""
+        data = self._cache.get(group_id)
+        if data is None:
+            return
+
+        data["updated_at"] = time.time()
+        self._known_empty_groups.discard(group_id)
+        self._dirty_groups.add(group_id)
+        if self._flush_handle is not None:
             return
 
         try:
-            data = self._cache[group_id]
-            data["updated_at"] = time.time()
-            file_path = self._get_file_path(group_id)
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_dirty_groups()
+            return
+
+        self._flush_handle = loop.call_later(self._SAVE_DELAY, self._write_dirty_groups)
 
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+    def _write_dirty_groups(self):
+        """编码所有待保存的群数据并交给后台写入器。"""
+        self._flush_handle = None
+        dirty_groups, self._dirty_groups = self._dirty_groups, set()
+        for group_id in dirty_groups:
+            data = self._cache.get(group_id)
+            if data is not None:
+                self._submit_group_data(group_id, data)
 
-            logger.debug(f"[lark_enhance] Saved memory for group {group_id}")
+    def _submit_group_data(self, group_id: str, data: dict):
+        try:
+            file_path = self._get_file_path(group_id)
+            self._writer.submit(file_path, _encode_json(data).encode("utf-8"))
+            logger.debug("[lark_enhance] Saved memory for group %s", group_id)
         except Exception as e:
             logger.error(f"[lark_enhance] Failed to save memory for group {group_id}: {e}")
 
+    def flush(self):
+        """同步写出所有尚未落盘的记忆文件（插件卸载或进程退出时调用）。"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._write_dirty_groups()
+        self._writer.flush()
+
+    def _add_memory_entry(
+        self,
+        memories: list[dict],
+        memory_type: str,
+        content: str,
+        max_count: int,
+    ) -> tuple[bool, int]:
+        """向记忆列表写入一条记忆（原地修改），返回（是否更新了已有记忆, 因超出上限移除的条数）。"""
+        start, end = self._type_range(memories, memory_type)
+        for index in range(start, end):
+            mem = memories[index]
+            if content in mem["content"] or mem["content"] in content:
+                mem["content"] = content
+                mem["updated_at"] = time.time()
+                # 更新时间变化后移动到同类型记忆的最前面
+                del memories[index]
+                bisect.insort(memories, mem, key=self._sort_key)
+                return True, 0
+
+        now = time.time()
+        new_memory = {
+            "id": str(uuid.uuid4()),
+            "type": memory_type,
+            "content": content,
+            "created_at": now,
+            "updated_at": now,
+        }
+        bisect.insort(memories, new_memory, key=self._sort_key)
+
+        overflow = len(memories) - max_count
+        if overflow <= 0:
+            return False, 0
+        if overflow == 1:
+            # 每次只新增一条，通常只超出一条：原地移除最早更新的条目，列表仍保持有序
+            del memories[self._oldest_index(memories)]
+        else:
+            # 上限被调小时可能一次超出多条：保留最近更新的条目，再恢复优先级顺序
+            kept = sorted(memories, key=lambda x: x["updated_at"], reverse=True)[:max_count]
+            kept.sort(key=self._sort_key)
+            memories[:] = kept
+        return False, overflow
+
+    @staticmethod
+    def _select_memories(
+        memories: list[dict],
+        limit: int,
+        memory_type: str | None,
+    ) -> list[dict]:
+        if memory_type:
+            memories = [m for m in memories if m.get("type") == memory_type]
+        return memories[:limit]
+
+    @staticmethod
+    def _delete_memory_entries(
+        container: dict,
+        memories_key: str,
+        target: str,
+        memory_type: str | None,
+    ) -> int:
+        """按关键词/类型删除 container[memories_key] 中的记忆，返回删除条数。"""
+        memories = container[memories_key]
+
+        if target == "all":
+            if not memory_type:
+                container[memories_key] = []
+                return len(memories)
+            kept = [mem for mem in memories if mem.get("type") != memory_type]
+        else:
+            target_lower = target.lower()
+            # 单次过滤保持原有顺序，不打乱按优先级排列的列表；
+            # 原文已直接包含小写关键词时必然匹配，只有未命中时才生成小写副本再比较
+            kept = [
+                mem
+                for mem in memories
+                if (memory_type and mem.get("type") != memory_type)
+                or (
+                    target_lower not in mem["content"]
+                    and target_lower not in mem["content"].lower()
+                )
+            ]
+
+        container[memories_key] = kept
+        return len(memories) - len(kept)
+
     def add_memory(
         self,
         group_id: str,
@@ -76,44 +309,24 @@ class UserMemoryStore:
         content: str,
         max_per_user: int = 20,
     ) -> bool:
-        if memory_type not in self.TYPE_PRIORITY:
+        if memory_type not in self._VALID_TYPES:
             logger.warning(f"[lark_enhance] Invalid memory type: {memory_type}")
             return False
 
         data = self._load_group_data(group_id)
+        user_data = data["users"].setdefault(user_id, {"memories": []})
 
-        if user_id not in data["users"]:
-            data["users"][user_id] = {"memories": []}
-
-        user_data = data["users"][user_id]
-        memories = user_data["memories"]
-
-        for mem in memories:
-            if mem["type"] == memory_type:
-                if content in mem["content"] or mem["content"] in content:
-                    mem["content"] = content
-                    mem["updated_at"] = time.time()
-                    self._save_group_data(group_id)
-                    logger.info(f"[lark_enhance] Updated memory for user {user_id}: {content[:30]}...")
-                    return True
-
-        new_memory = {
-            "id": str(uuid.uuid4()),
-            "type": memory_type,
-            "content": content,
-            "created_at": time.time(),
-            "updated_at": time.time(),
-        }
-        memories.append(new_memory)
-
-        if len(memories) > max_per_user:
-            memories.sort(key=lambda x: x["updated_at"], reverse=True)
-            removed = memories[max_per_user:]
-            user_data["memories"] = memories[:max_per_user]
-            logger.debug(f"[lark_enhance] Removed {len(removed)} old memories for user {user_id}")
+        updated, removed = self._add_memory_entry(
+            user_data["memories"], memory_type, content, max_per_user
+        )
+        if removed:
+            logger.debug("[lark_enhance] Removed %d old memories for user %s", removed, user_id)
 
         self._save_group_data(group_id)
-        logger.info(f"[lark_enhance] Added memory for user {user_id}: {content[:30]}...")
+        if updated:
+            logger.info("[lark_enhance] Updated memory for user %s: %.30s...", user_id, content)
+        else:
+            logger.info("[lark_enhance] Added memory for user %s: %.30s...", user_id, content)
         return True
 
     def get_memories(
@@ -123,21 +336,12 @@ class UserMemoryStore:
         limit: int = 10,
         memory_type: str | None = None,
     ) -> list[dict]:
-        data = self._load_group_data(group_id)
+        data = self._peek_group_data(group_id)
 
-        if user_id not in data["users"]:
+        if data is None or user_id not in data["users"]:
             return []
 
-        memories = data["users"][user_id]["memories"]
-        if memory_type:
-            memories = [m for m in memories if m.get("type") == memory_type]
-
-        sorted_memories = sorted(
-            memories,
-            key=lambda x: (self.TYPE_PRIORITY.get(x["type"], 99), -x["updated_at"]),
-        )
-
-        return sorted_memories[:limit]
+        return self._select_memories(data["users"][user_id]["memories"], limit, memory_type)
 
     def delete_memories(
         self,
@@ -146,38 +350,18 @@ class UserMemoryStore:
         target: str = "all",
         memory_type: str | None = None,
     ) -> int:
-        data = self._load_group_data(group_id)
+        data = self._peek_group_data(group_id)
 
-        if user_id not in data["users"]:
+        if data is None or user_id not in data["users"]:
             return 0
 
-        user_data = data["users"][user_id]
-        memories = user_data["memories"]
-        if memory_type:
-            memories = [m for m in memories if m.get("type") == memory_type]
-        original_count = len(memories)
-
-        if target == "all":
-            if memory_type:
-                user_data["memories"] = [
-                    mem for mem in user_data["memories"] if mem.get("type") != memory_type
-                ]
-            else:
-                user_data["memories"] = []
-            deleted_count = original_count
-        else:
-            target_lower = target.lower()
-            kept = [mem for mem in memories if target_lower not in mem["content"].lower()]
-            deleted_count = original_count - len(kept)
-            if memory_type:
-                others = [mem for mem in user_data["memories"] if mem.get("type") != memory_type]
-                user_data["memories"] = others + kept
-            else:
-                user_data["memories"] = kept
+        deleted_count = self._delete_memory_entries(
+            data["users"][user_id], "memories", target, memory_type
+        )
 
         if deleted_count > 0:
             self._save_group_data(group_id)
-            logger.info(f"[lark_enhance] Deleted {deleted_count} memories for user {user_id}")
+            logger.info("[lark_enhance] Deleted %d memories for user %s", deleted_count, user_id)
 
         return deleted_count
 
@@ -188,45 +372,22 @@ class UserMemoryStore:
         content: str,
         max_per_group: int = 30,
     ) -> bool:
-        if memory_type not in self.TYPE_PRIORITY:
+        if memory_type not in self._VALID_TYPES:
             logger.warning(f"[lark_enhance] Invalid memory type: {memory_type}")
             return False
 
         data = self._load_group_data(group_id)
+        memories = data.setdefault("group_memories", [])
 
-        if "group_memories" not in data:
-            data["group_memories"] = []
-
-        memories = data["group_memories"]
-
-        for mem in memories:
-            if mem["type"] == memory_type:
-                if content in mem["content"] or mem["content"] in content:
-                    mem["content"] = content
-                    mem["updated_at"] = time.time()
-                    self._save_group_data(group_id)
-                    logger.info(
-                        f"[lark_enhance] Updated group memory for {group_id}: {content[:30]}..."
-                    )
-                    return True
-
-        new_memory = {
-            "id": str(uuid.uuid4()),
-            "type": memory_type,
-            "content": content,
-            "created_at": time.time(),
-            "updated_at": time.time(),
-        }
-        memories.append(new_memory)
-
-        if len(memories) > max_per_group:
-            memories.sort(key=lambda x: x["updated_at"], reverse=True)
-            removed = memories[max_per_group:]
-            data["group_memories"] = memories[:max_per_group]
-            logger.debug(f"[lark_enhance] Removed {len(removed)} old group memories for {group_id}")
+        updated, removed = self._add_memory_entry(memories, memory_type, content, max_per_group)
+        if removed:
+            logger.debug("[lark_enhance] Removed %d old group memories for %s", removed, group_id)
 
         self._save_group_data(group_id)
-        logger.info(f"[lark_enhance] Added group memory for {group_id}: {content[:30]}...")
+        if updated:
+            logger.info("[lark_enhance] Updated group memory for %s: %.30s...", group_id, content)
+        else:
+            logger.info("[lark_enhance] Added group memory for %s: %.30s...", group_id, content)
         return True
 
     def get_group_memories(
@@ -235,21 +396,12 @@ class UserMemoryStore:
         limit: int = 10,
         memory_type: str | None = None,
     ) -> list[dict]:
-        data = self._load_group_data(group_id)
+        data = self._peek_group_data(group_id)
 
-        if "group_memories" not in data:
+        if data is None or "group_memories" not in data:
             return []
 
-        memories = data["group_memories"]
-        if memory_type:
-            memories = [m for m in memories if m.get("type") == memory_type]
-
-        sorted_memories = sorted(
-            memories,
-            key=lambda x: (self.TYPE_PRIORITY.get(x["type"], 99), -x["updated_at"]),
-        )
-
-        return sorted_memories[:limit]
+        return self._select_memories(data["group_memories"], limit, memory_type)
 
     def delete_group_memories(
         self,
@@ -257,37 +409,18 @@ class UserMemoryStore:
         target: str = "all",
         memory_type: str | None = None,
     ) -> int:
-        data = self._load_group_data(group_id)
+        data = self._peek_group_data(group_id)
 
-        if "group_memories" not in data:
+        if data is None or "group_memories" not in data:
             return 0
 
-        memories = data["group_memories"]
-        if memory_type:
-            memories = [m for m in memories if m.get("type") == memory_type]
-        original_count = len(memories)
-
-        if target == "all":
-            if memory_type:
-                data["group_memories"] = [
-                    mem for mem in data["group_memories"] if mem.get("type") != memory_type
-                ]
-            else:
-                data["group_memories"] = []
-            deleted_count = original_count
-        else:
-            target_lower = target.lower()
-            kept = [mem for mem in memories if target_lower not in mem["content"].lower()]
-            deleted_count = original_count - len(kept)
-            if memory_type:
-                other = [mem for mem in data["group_memories"] if mem.get("type") != memory_type]
-                data["group_memories"] = other + kept
-            else:
-                data["group_memories"] = kept
+        deleted_count = self._delete_memory_entries(
+            data, "group_memories", target, memory_type
+        )
 
         if deleted_count > 0:
             self._save_group_data(group_id)
-            logger.info(f"[lark_enhance] Deleted {deleted_count} group memories for {group_id}")
+            logger.info("[lark_enhance] Deleted %d group memories for %s", deleted_count, group_id)
 
         return deleted_count
 
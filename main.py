@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 import atexit
 import re
-from collections import OrderedDict, defaultdict, deque
+from collections import deque
 from pathlib import Path
 
 from astrbot.api import logger, star
@@ -22,12 +23,13 @@ from .lark_enhance.handlers import (
 )
 from .lark_enhance.mixins import (
     HistoryMixin,
+    HistoryRecord,
     LarkContextMixin,
     StreamingMixin,
     TextMixin,
     configure_streaming_runtime,
 )
-from .lark_enhance.stores import UserMemoryStore
+from .lark_enhance.stores import BackgroundFileWriter, UserMemoryStore
 
 
 class Main(HistoryMixin, LarkContextMixin, TextMixin, StreamingMixin, star.Star):
@@ -35,8 +37,11 @@ class Main(HistoryMixin, LarkContextMixin, TextMixin, StreamingMixin, star.Star)
 
     _CACHE_TTL = 300
     _SAVE_DEBOUNCE = 5
+    _SAVE_INTERVAL_MIN = 0.1
     _USER_CACHE_MAX_SIZE = 5000
+    _REACTED_MESSAGES_MAX_SIZE = 1000
     _CLEAN_CONTENT_MAX_LEN = 10000
+    _CLEAN_CONTENT_CACHE_SIZE = 256
     _MEME_CAPTURE_PATTERNS = [
         re.compile(r"^\s*记住这个梗[:：]?\s*(.+)$"),
         re.compile(r"^\s*(?:这|这个)?(?:就是)?(?:我们)?群梗[:：]?\s*(.+)$"),
@@ -45,31 +50,47 @@ class Main(HistoryMixin, LarkContextMixin, TextMixin, StreamingMixin, star.Star)
     def __init__(self, context: star.Context, config: dict | None = None):
         super().__init__(context)
         self.config = config or {}
+        self._refresh_config()
 
-        self.user_cache: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        # 普通 dict 保持插入顺序，命中时不再调整顺序，容量满时淘汰最早写入的条目
+        self.user_cache: dict[str, tuple[str, float]] = {}
         self.group_members_cache: dict[str, dict[str, str]] = {}
-        self._group_members_cache_time: dict[str, float] = {}
-        self._mention_pattern_cache: dict[str, tuple[re.Pattern, float]] = {}
+        self._group_members_cache_expiry: dict[str, float] = {}
+        self._mention_pattern_cache: dict[
+            str, tuple[dict[str, str], frozenset[str], re.Pattern]
+        ] = {}
         self.group_info_cache: dict[str, dict] = {}
-        self._group_info_cache_time: dict[str, float] = {}
+        self._group_info_cache_expiry: dict[str, float] = {}
+        # 进行中的飞书查询，(查询类型, id) -> Future，用于合并并发的相同查询
+        self._inflight_requests: dict[tuple[str, str], asyncio.Future] = {}
 
-        self._reacted_messages: OrderedDict[str, bool] = OrderedDict()
+        # 集合负责成员判断，定长 deque 记录写入顺序，满员时由 deque 自动挤出最早的一条
+        self._reacted_messages: set[str] = set()
+        self._reacted_order: deque[str] = deque(maxlen=self._REACTED_MESSAGES_MAX_SIZE)
+        self._clean_content_cache: dict[str, str] = {}
 
-        self._history_maxlen = self.config.get("history_inject_count", 20) or 20
-        self.group_history: dict[str, deque] = defaultdict(
-            lambda: deque(maxlen=self._history_maxlen)
-        )
+        self._history_maxlen = self._history_count or 20
+        self.group_history: dict[str, deque[HistoryRecord]] = {}
+        self._last_time_second: int = -1
+        self._last_time_str: str = ""
 
         self._data_dir: Path = StarTools.get_data_dir("astrbot_plugin_lark_enhance")
         self._history_file: Path = self._data_dir / "group_history.json"
 
-        self._last_save_time: float = 0
         self._pending_save: bool = False
+        self._save_interval: float = self._SAVE_INTERVAL_MIN
+        self._save_requests: int = 0
+        self._save_task: asyncio.Task | None = None
+        self._history_writer = BackgroundFileWriter()
 
         self._load_history()
         self._memory_store = UserMemoryStore(self._data_dir)
+        self._warm_memory_task: asyncio.Task | None = None
+        if self._enable_user_memory and self.group_history:
+            self._start_memory_warmup()
 
         atexit.register(self._atexit_save)
+        atexit.register(self._memory_store.flush)
 
         configure_streaming_runtime(self.config, self._clean_content)
 
@@ -81,11 +102,46 @@ class Main(HistoryMixin, LarkContextMixin, TextMixin, StreamingMixin, star.Star)
         logger.info(
             f"[lark_enhance] ====== Plugin loaded successfully ====== "
             f"Version: {self._VERSION}, "
-            f"UserMemory: {self.config.get('enable_user_memory', True)}, "
-            f"VibeSense: {self.config.get('enable_vibe_sense', True)}, "
-            f"MemeMemory: {self.config.get('enable_meme_memory', True)}"
+            f"UserMemory: {self._enable_user_memory}, "
+            f"VibeSense: {self._enable_vibe_sense}, "
+            f"MemeMemory: {self._enable_meme_memory}"
+        )
+
+    def _refresh_config(self):
+        """缓存热路径上读取的配置项，避免每条消息重复查询 config。"""
+        config = self.config
+        self._enable_real_name = config.get("enable_real_name", True)
+        self._enable_group_info = config.get("enable_group_info", True)
+        self._enable_quoted_content = config.get("enable_quoted_content", True)
+        self._history_count = config.get("history_inject_count", 20)
+        self._bot_name = config.get("bot_name", "助手")
+        self._enable_user_memory = config.get("enable_user_memory", True)
+        self._memory_inject_limit = config.get("memory_inject_limit", 10)
+        self._enable_vibe_sense = config.get("enable_vibe_sense", True)
+        self._enable_meme_memory = config.get("enable_meme_memory", True)
+        self._enable_human_rhythm = config.get("enable_human_rhythm", True)
+        self._enable_mention_convert = config.get("enable_mention_convert", True)
+        self._memory_max_per_group = config.get("memory_max_per_group", 30)
+        self._memory_max_per_user = config.get("memory_max_per_user", 20)
+
+    def _start_memory_warmup(self):
+        """后台预读有历史记录的群的记忆文件（通常就是近期活跃的群）。"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._warm_memory_task = loop.create_task(
+            self._memory_store.warm_cache(list(self.group_history))
         )
 
+    async def terminate(self):
+        if self._warm_memory_task is not None:
+            self._warm_memory_task.cancel()
+        self._cancel_pending_save_task()
+        self._flush_pending_save()
+        self._history_writer.flush()
+        self._memory_store.flush()
+
     @filter.platform_adapter_type(filter.PlatformAdapterType.LARK)
     async def on_message(self, event: AstrMessageEvent):
         await handle_on_message(self, event)
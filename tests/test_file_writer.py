@@ -0,0 +1,88 @@
+import asyncio
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+try:
+    from lark_enhance.stores import file_writer
+except ImportError as e:  # 需要 AstrBot 运行环境
+    raise unittest.SkipTest(f"AstrBot runtime not available: {e}")
+
+
+class BackgroundFileWriterFlushTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = Path(tmp_dir.name) / "data.json"
+
+    def test_flush_waits_for_in_flight_write(self):
+        started = threading.Event()
+        release = threading.Event()
+        original_write = file_writer.write_bytes_atomic
+
+        def slow_write(path, data):
+            started.set()
+            release.wait(5)
+            original_write(path, data)
+
+        writer = file_writer.BackgroundFileWriter()
+
+        async def run():
+            writer.submit(self.path, b'{"a": 1}')
+            # 等后台线程取走内容：此时待写表已空，写入仍在进行中
+            self.assertTrue(await asyncio.to_thread(started.wait, 5))
+            timer = threading.Timer(0.2, release.set)
+            timer.start()
+            try:
+                writer.flush()
+                self.assertTrue(release.is_set())
+                self.assertEqual(self.path.read_bytes(), b'{"a": 1}')
+            finally:
+                timer.cancel()
+                release.set()
+
+        with mock.patch.object(file_writer, "write_bytes_atomic", slow_write):
+            asyncio.run(run())
+
+    def test_peek_does_not_wait_for_in_flight_write(self):
+        started = threading.Event()
+        release = threading.Event()
+        original_write = file_writer.write_bytes_atomic
+
+        def slow_write(path, data):
+            started.set()
+            release.wait(5)
+            original_write(path, data)
+
+        writer = file_writer.BackgroundFileWriter()
+        other_path = self.path.with_name("other.json")
+
+        async def run():
+            writer.submit(self.path, b"1")
+            self.assertTrue(await asyncio.to_thread(started.wait, 5))
+            try:
+                self.assertEqual(writer.peek(self.path), b"1")
+                self.assertIsNone(writer.peek(other_path))
+                writer.submit(self.path, b"2")
+                self.assertEqual(writer.peek(self.path), b"2")
+                self.assertFalse(release.is_set())
+            finally:
+                release.set()
+            await asyncio.to_thread(writer.flush)
+            self.assertIsNone(writer.peek(self.path))
+            self.assertEqual(self.path.read_bytes(), b"2")
+
+        with mock.patch.object(file_writer, "write_bytes_atomic", slow_write):
+            asyncio.run(run())
+
+    def test_flush_without_loop_writes_pending(self):
+        writer = file_writer.BackgroundFileWriter()
+        writer.submit(self.path, b"[]")
+        writer.flush()
+        self.assertEqual(self.path.read_bytes(), b"[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import tempfile
+import unittest
+from collections import deque
+from pathlib import Path
+
+try:
+    from lark_enhance.mixins.history import HistoryMixin
+except ImportError as e:  # 需要 AstrBot 运行环境
+    raise unittest.SkipTest(f"AstrBot runtime not available: {e}")
+
+
+class _History(HistoryMixin):
+    def __init__(self, history_file: Path):
+        self._history_file = history_file
+        self._history_maxlen = 20
+        self.group_history: dict[str, deque] = {}
+
+
+class LoadHistoryTest(unittest.TestCase):
+    def _load(self, data) -> _History:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        history_file = Path(tmp_dir.name) / "group_history.json"
+        history_file.write_text(json.dumps(data), encoding="utf-8")
+        history = _History(history_file)
+        history._load_history()
+        return history
+
+    def test_null_fields_do_not_drop_history(self):
+        history = self._load(
+            {
+                "g1": [
+                    {"msg_id": "m1", "time": "10:00:00", "sender": "Alice",
+                     "sender_id": None, "content": "hi"},
+                    {"msg_id": None, "time": None, "sender": None,
+                     "sender_id": None, "content": None},
+                    ["m3", "10:00:02", None, None, "yo"],
+                ],
+                "g2": [
+                    {"msg_id": "m4", "time": "10:00:03", "sender": "Bob",
+                     "sender_id": "ou_abcdef", "content": "ok"},
+                ],
+            }
+        )
+
+        self.assertEqual(set(history.group_history), {"g1", "g2"})
+        g1 = list(history.group_history["g1"])
+        self.assertEqual(len(g1), 3)
+        self.assertEqual(g1[0].sender_id, "")
+        self.assertEqual(g1[0].line, "[10:00:00] Alice: hi")
+        self.assertEqual(g1[1].sender, "未知用户")
+        self.assertEqual(g1[2].content, "yo")
+        self.assertEqual(history.group_history["g2"][0].line, "[10:00:03] Bob(cdef): ok")
+
+    def test_missing_file_leaves_history_empty(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        history = _History(Path(tmp_dir.name) / "group_history.json")
+        with self.assertNoLogs(level="ERROR"):
+            history._load_history()
+        self.assertEqual(history.group_history, {})
+
+    def test_malformed_record_is_skipped(self):
+        history = self._load(
+            {
+                "g1": [
+                    {"msg_id": "m1", "time": "10:00:00", "sender": "Alice",
+                     "sender_id": "ou_1", "content": "hi"},
+                    "not a record",
+                    ["too", "short"],
+                ],
+                "g2": None,
+            }
+        )
+
+        self.assertEqual([r.msg_id for r in history.group_history["g1"]], ["m1"])
+        self.assertNotIn("g2", history.group_history)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+try:
+    from lark_enhance.stores import file_writer
+    from lark_enhance.stores.user_memory_store import UserMemoryStore
+except ImportError as e:  # 需要 AstrBot 运行环境
+    raise unittest.SkipTest(f"AstrBot runtime not available: {e}")
+
+
+class UserMemoryStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.data_dir = Path(tmp_dir.name)
+
+    def test_evicted_group_is_read_back_without_waiting_for_write(self):
+        started = threading.Event()
+        release = threading.Event()
+        original_write = file_writer.write_bytes_atomic
+
+        def slow_write(path, data):
+            started.set()
+            release.wait(5)
+            original_write(path, data)
+
+        store = UserMemoryStore(self.data_dir)
+
+        async def run():
+            store.add_memory("g1", "u1", "fact", "likes tea")
+            # 缓存容量为 1：加载 g2 会淘汰 g1，并把其未保存的修改交给后台线程写入
+            store.add_memory("g2", "u2", "fact", "likes coffee")
+            self.assertTrue(await asyncio.to_thread(started.wait, 5))
+            try:
+                begin = time.monotonic()
+                memories = store.get_memories("g1", "u1")
+                self.assertLess(time.monotonic() - begin, 1)
+            finally:
+                release.set()
+            self.assertEqual([mem["content"] for mem in memories], ["likes tea"])
+            await asyncio.to_thread(store.flush)
+
+        with mock.patch.object(UserMemoryStore, "_CACHE_MAX_SIZE", 1), mock.patch.object(
+            file_writer, "write_bytes_atomic", slow_write
+        ):
+            asyncio.run(run())
+
+        self.assertTrue((self.data_dir / "user_memory" / "g1.json").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()